@@ -0,0 +1,258 @@
+
+# Replays traces of user input against a headless grid and reports how long each frame took, so that changes to the
+# program can be compared. The results are printed as JSON. For example: python benchmark.py --output results.json
+# By default each frame works out the equations' curves itself, which is repeatable but slower than the program, where
+# they are worked out by the geometry worker's thread. --worker runs that thread as the program does, so frames are
+# drawn at the maximum frame rate and only time the main loop's share of the work.
+
+import argparse
+import os
+import sys
+import json
+import time
+import math
+import platform
+import subprocess
+import tracemalloc
+import numpy
+
+# pygame prints a message when it is imported, which would come before the JSON results
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+import pygame
+import main
+
+try:
+	import resource
+except ImportError:
+	# The resource module is only available on Unix
+	resource = None
+
+# Equations drawn in every trace, as well as the example graphs
+standardCorpus = [
+	"y=sin(x)",
+	"y=tan(x)",
+	"y=1/x",
+	"y=sqrt(x)",
+	"y=x**3-2*x",
+	"y=exp(-x**2)",
+	"x**2+y**2=25",
+	"sin(x*y)=0.5"
+]
+
+def loadCorpus(path):
+	# Return the standard equations along with every saved graph in the folder
+	corpus = list(standardCorpus)
+
+	for name in sorted(os.listdir(path)):
+		# Hidden files, such as the folder's catalog, aren't graphs
+		if name.endswith(".json") and not name.startswith("."):
+			with open(os.path.join(path, name)) as graphFile:
+				corpus.append(json.load(graphFile)["equation"])
+
+	return corpus
+
+def syntheticTraces(corpus):
+	# Return the standard traces. Every trace except 'add' begins with the whole corpus already plotted.
+	return {
+		"add": [ {"type": "add", "equation": equation} for equation in corpus ],
+		"drag": [ {"type": "drag", "x": 6, "y": 2} ] * 100 + [ {"type": "drag", "x": -6, "y": -2} ] * 100,
+		# Short drags with the mouse held still in between, so that layers are scrolled after they have been left unchanged
+		"pan": [ {"type": "drag", "x": x, "y": y} if y is not None else {"type": "idle"} for x, y in [ (-11, 3), (0, None), (12, 10), (0, None), (5, -7), (0, None), (30, 2), (0, None) ] ] * 10,
+		"zoom": [ {"type": "zoom", "direction": "in"} ] * 20 + [ {"type": "zoom", "direction": "out"} ] * 40 + [ {"type": "zoom", "direction": "in"} ] * 20,
+		"toggle": [ {"type": "toggle", "index": i} for i in range(len(corpus)) ] * 2
+	}
+
+def applyEvent(event):
+	# Apply a single input event to the grid
+	if event["type"] == "add":
+		main.equations.createEquation(event["equation"], background=False)
+
+	elif event["type"] == "drag":
+		main.input.moveGraph(event["x"], event["y"])
+
+	elif event["type"] == "zoom":
+		main.input.zoom(event["direction"])
+
+	elif event["type"] == "toggle":
+		toggled = main.equations.equationList[event["index"]]
+		toggled.visible = not toggled.visible
+		main.scheduler.markDirty()
+
+	# An idle event draws a frame without any input
+
+def resetGrid(equations, forgetSamples=True, threaded=False):
+	# Start a trace from the default camera with only the given equations plotted, and no cached samples or solutions.
+	# If forgetSamples is False, the samples of the equations already plotted on another grid are kept.
+	# If threaded is True, the curves are worked out by the geometry worker's thread, like in the program.
+	main.grid.setCamera(0, 0, 20, 20)
+	# The thread of the last trace's worker is stopped, as it would otherwise work out the curves of the new equations too
+	main.equations.worker.stop()
+	main.equations = main.equationController()
+	main.equations.solutions = main.solutionCache(":memory:")
+
+	# The memory budget of the sample caches is shared by every equation, so the tiles of the last trace are forgotten too
+	if forgetSamples:
+		main.sampleCache.usage.clear()
+		main.sampleCache.totalBytes = 0
+
+	for equation in equations:
+		main.equations.createEquation(equation, background=False)
+
+	main.grid.drawGrid()
+
+	if threaded:
+		main.equations.worker.start()
+
+def runTrace(trace, measureMemory, threaded=False):
+	# Replay a trace, drawing a frame after every event, and return the statistics of the frames.
+	# Tracing memory allocations slows down every frame, so it is only done when asked for.
+	# If the geometry worker's thread is running, each frame is followed by a wait until the maximum frame rate allows the
+	# next, which gives the thread time to work out the curves as it would have in the program.
+	frameTimes = []
+	if measureMemory:
+		tracemalloc.start()
+	startTime = time.perf_counter()
+
+	for event in trace:
+		frameStart = time.perf_counter()
+
+		applyEvent(event)
+		main.grid.drawGrid()
+
+		frameTimes.append(time.perf_counter() - frameStart)
+
+		if threaded:
+			# The events that the worker posts when curves are ready are discarded, as nothing is waiting for them
+			pygame.event.clear()
+			remaining = frameStart + 1/main.options["maxFrameRate"] - time.perf_counter()
+			if remaining > 0:
+				time.sleep(remaining)
+
+	totalTime = time.perf_counter() - startTime
+	frameTimes = numpy.array(frameTimes) * 1000
+
+	results = {
+		"frames": len(frameTimes),
+		"totalSeconds": totalTime,
+		"framesPerSecond": len(frameTimes) / totalTime,
+		"meanMilliseconds": float(numpy.mean(frameTimes)),
+		"p50Milliseconds": float(numpy.percentile(frameTimes, 50)),
+		"p90Milliseconds": float(numpy.percentile(frameTimes, 90)),
+		"p99Milliseconds": float(numpy.percentile(frameTimes, 99)),
+		"maxMilliseconds": float(numpy.max(frameTimes))
+	}
+
+	if measureMemory:
+		currentMemory, results["peakTracedBytes"] = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+
+	return results
+
+def unmatchedPixels(surface, fullSurface):
+	# Return the number of pixels of a surface with a colour that the other surface doesn't have at or next to the same pixel
+	pixels = pygame.surfarray.array2d(surface)
+	width, height = pixels.shape
+	padded = numpy.pad( pygame.surfarray.array2d(fullSurface), 1, mode="edge" )
+	matched = numpy.zeros(pixels.shape, dtype=bool)
+
+	for offsetX in range(3):
+		for offsetY in range(3):
+			matched |= pixels == padded[offsetX : offsetX + width, offsetY : offsetY + height]
+
+	return int(numpy.count_nonzero(~matched))
+
+def checkTrace(trace, equations):
+	# Replay a trace on two grids side by side, one as usual and one redrawing the grid layer and every equation's layer in
+	# full for every frame, and return the most pixels in any frame's layers that don't match the full redraw. Scrolled
+	# layers are moved by whole pixels, so their curves can be a pixel away from where a full redraw puts them, but a layer
+	# that has been damaged has colours that aren't drawn anywhere near the same pixels. A few pixels can also differ where a
+	# steep curve leaves the edge of the grid, since a scrolled layer keeps segments drawn while they were in view. Curves are sampled fully, so that
+	# both grids draw the same samples however long each of their frames takes.
+	frameBudget, main.options["frameBudget"] = (main.options["frameBudget"], math.inf)
+	grids = []
+
+	for fullRedraw in (False, True):
+		main.grid = main.gridController()
+		resetGrid(equations, grids == [])
+		grids.append( (main.grid, main.equations, fullRedraw) )
+
+	damaged = 0
+
+	for event in trace:
+		layers = []
+
+		for main.grid, main.equations, fullRedraw in grids:
+			applyEvent(event)
+
+			if fullRedraw:
+				main.grid.gridLayerKey = None
+				for plotted in main.equations.equationList:
+					plotted.layerKey = None
+
+			main.grid.drawGrid()
+			layers.append( [main.grid.gridLayer] + [ plotted.layer for plotted in main.equations.equationList if plotted.visible and plotted.layer is not None ] )
+
+		damaged = max( damaged, sum( unmatchedPixels(layer, fullLayer) for layer, fullLayer in zip(*layers) ) )
+
+	main.options["frameBudget"] = frameBudget
+	return damaged
+
+def getCommit():
+	# Return the current git commit, so that results can be compared across commits
+	try:
+		return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Replay input traces against a headless grid and report frame times as JSON.")
+	parser.add_argument("--examples", default="./Graphs/Examples", help="folder of saved graphs added to the standard equations")
+	parser.add_argument("--trace", action="append", default=[], help="JSON file containing a recorded trace to replay, instead of the standard traces")
+	parser.add_argument("--size", type=int, nargs=2, default=(700, 600), metavar=("WIDTH", "HEIGHT"), help="size of the grid in pixels")
+	parser.add_argument("--memory", action="store_true", help="trace the peak memory allocated during each trace, which slows down every frame")
+	parser.add_argument("--check", action="store_true", help="replay each trace again to count the pixels of scrolled layers that don't match a full redraw")
+	parser.add_argument("--worker", action="store_true", help="work out the curves in the geometry worker's thread like the program does, instead of in each frame")
+	parser.add_argument("--output", help="file to write the results to, as well as printing them")
+	arguments = parser.parse_args()
+
+	main.initHeadless(*arguments.size)
+	main.input = main.inputHandler()
+
+	corpus = loadCorpus(arguments.examples)
+
+	if arguments.trace != []:
+		traces = {}
+		for path in arguments.trace:
+			with open(path) as traceFile:
+				traces[os.path.splitext(os.path.basename(path))[0]] = json.load(traceFile)
+	else:
+		traces = syntheticTraces(corpus)
+
+	results = {
+		"commit": getCommit(),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"size": arguments.size,
+		"worker": arguments.worker,
+		"corpus": corpus,
+		"traces": {}
+	}
+
+	for name, trace in traces.items():
+		# Traces that add equations start from an empty grid, every other trace starts with the whole corpus plotted
+		startEquations = [] if any(event["type"] == "add" for event in trace) else corpus
+		resetGrid(startEquations, threaded=arguments.worker)
+		results["traces"][name] = runTrace(trace, arguments.memory, arguments.worker)
+
+		if arguments.check:
+			results["traces"][name]["damagedPixels"] = checkTrace(trace, startEquations)
+
+	if resource is not None:
+		results["peakResidentKilobytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+	json.dump(results, sys.stdout, indent=4)
+	print()
+
+	if arguments.output is not None:
+		with open(arguments.output, 'w') as outputFile:
+			json.dump(results, outputFile, indent=4)
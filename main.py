@@ -1,14 +1,26 @@
 
+import time
+startTime = time.perf_counter() # Used to time how long each phase of starting the program takes
+
 import pygame
 import tkinter as tk
+from tkinter import filedialog
 import os
 import sys
 import platform
 import numpy
 import math
-from math import sqrt, log, sin, cos, tan, sinh, cosh, tanh
-import sympy
 import json
+import threading
+import multiprocessing
+import signal
+import sqlite3
+import struct
+import bisect
+from collections import OrderedDict
+
+# sympy takes longer to import than the rest of the program takes to start, so it is imported by loadSympy once it is needed
+sympy = None
 
 options = {
 	"windowWidth": 1000, # Width of the window, in pixels.
@@ -29,8 +41,20 @@ options = {
 	"guidelineThickness": 1, # Thickness of guidelines in pixels
 	"fontColour": (0, 0, 0), # Colour of the guideline marker font ( R, G, B )
 
-	"noOfPlotsBase": 125, # Base sampling rate of plotted graphs ( Higher = More Accurate )
-	"noOfPlots": 125 # Sampling rate adjusted for the amount of plotted graphs
+	"analysis": 0, # Marks the roots, turning points and intersections of the graphs that can be seen, toggle on/off
+	"analysisColour": (0, 90, 200), # Colour of the marked points ( R, G, B )
+
+	"noOfPlotsBase": 125, # Most samples added per 32 pixels when refining a graph, lowered for graphs that take longer to solve ( Higher = More Accurate )
+	"sampleCacheMemory": 67108864, # Most memory in bytes used to store the solved points of every plotted graph
+	"frameBudget": 8, # Most milliseconds spent solving graphs for each frame, before less accurate samples are shown until later frames
+	"maxFrameRate": 60, # Maximum number of times the grid is redrawn per second
+	"solveTimeout": 5, # Seconds to spend solving a graph for y before drawing it implicitly instead
+	"solutionCacheSize": 1000, # Maximum number of solved graphs stored on disk, so they don't need to be solved again
+
+	"workspaceSamples": 1, # Saves the solved points of every graph in workspace files, so they don't have to be solved again when loaded
+
+	"statsOverlay": 0, # Shows the frame rate and the time spent on each stage of drawing over the grid
+	"statsFile": "" # File that the statistics of every frame are added to as lines of JSON, or "" to not record them
 }
 
 class guiController():
@@ -40,6 +64,8 @@ class guiController():
 		self.gridWidth = options["gridWidth"]
 		self.windowHeight = options["windowHeight"]
 
+		self.catalogs = {} # Path of a folder : catalog of the graphs saved in it
+
 		# Initialize the tkinter window
 		self.root = tk.Tk()
 		self.root.title("Maths Graphing Tool")
@@ -48,6 +74,8 @@ class guiController():
 		# Initialize the frames for the grid and the menu
 		self.gridFrame = tk.Frame(self.root, width = self.gridWidth, height = self.windowHeight)
 		self.gridFrame.pack(side = tk.RIGHT, fill="both", expand=True)
+		# The grid has to be redrawn whenever its frame is uncovered
+		self.gridFrame.bind("<Expose>", lambda event: scheduler.markDirty())
 		self.menuFrame = tk.Frame(self.root, width = self.windowWidth-self.gridWidth, height = self.windowHeight)
 		self.menuFrame.pack(side = tk.LEFT, fill="both", expand=True)
 		self.menuFrame.grid_propagate(0)
@@ -111,19 +139,23 @@ class guiController():
 		self.optionsButton = tk.Button(self.optionsFrame, text="Options", command=self.openSettings)
 		self.saveButton = tk.Button(self.optionsFrame, text="Save Graphs", command=self.saveGraphs)
 		self.loadButton = tk.Button(self.optionsFrame, text="Load Graphs", command=lambda path="./Graphs/": self.loadGraphs(path))
+		self.saveWorkspaceButton = tk.Button(self.optionsFrame, text="Save Workspace", command=self.saveWorkspace)
+		self.loadWorkspaceButton = tk.Button(self.optionsFrame, text="Load Workspace", command=self.loadWorkspace)
 
 		self.tutorialButton.grid(row=0,column=0,sticky=tk.N+tk.S+tk.E+tk.W)	
 		self.examplesButton.grid(row=0,column=1,sticky=tk.N+tk.S+tk.E+tk.W)	
 		self.optionsButton.grid(row=2,column=0, columnspan=2,sticky=tk.N+tk.S+tk.E+tk.W)
 		self.saveButton.grid(row=1,column=0,sticky=tk.N+tk.S+tk.E+tk.W)	
 		self.loadButton.grid(row=1,column=1,sticky=tk.N+tk.S+tk.E+tk.W)
+		self.saveWorkspaceButton.grid(row=3,column=0,sticky=tk.N+tk.S+tk.E+tk.W)
+		self.loadWorkspaceButton.grid(row=3,column=1,sticky=tk.N+tk.S+tk.E+tk.W)
 
 		self.menuFrame.columnconfigure(0, weight=1)
 		self.menuFrame.rowconfigure(0, weight=1)
 		self.menuFrame.rowconfigure(1, weight=10)
 		self.menuFrame.rowconfigure(2, weight=3)
 
-		for i in range(3):
+		for i in range(4):
 			self.optionsFrame.rowconfigure(i, weight=1)
 
 		for i in range(2):
@@ -195,7 +227,7 @@ class guiController():
 		self.guidelinesToggle.set(options["guidelines"])
 		guideLinesLabel = tk.Label(settingsFrame, text="Guidelines Toggle")
 		guideLinesCheckbox = tk.Checkbutton(settingsFrame, variable = self.guidelinesToggle)
-		self.settingsWidgets.append([guideLinesLabel, guideLinesCheckbox])
+		self.settingsWidgets.append([guideLinesLabel, guideLinesCheckbox, self.guidelinesToggle])
 
 		guidelineColourLabel = tk.Label(settingsFrame, text="Guideline Colour")
 		guidelineColourEntry = tk.Entry(settingsFrame)
@@ -217,11 +249,43 @@ class guiController():
 		fontColourEntry.insert(0, options["fontColour"])
 		self.settingsWidgets.append([fontColourLabel, fontColourEntry])
 
+		self.analysisToggle = tk.IntVar()
+		self.analysisToggle.set(options["analysis"])
+		analysisLabel = tk.Label(settingsFrame, text="Mark Roots and Intersections")
+		analysisCheckbox = tk.Checkbutton(settingsFrame, variable = self.analysisToggle)
+		self.settingsWidgets.append([analysisLabel, analysisCheckbox, self.analysisToggle])
+
+		analysisColourLabel = tk.Label(settingsFrame, text="Marked Point Colour")
+		analysisColourEntry = tk.Entry(settingsFrame)
+		analysisColourEntry.insert(0, options["analysisColour"])
+		self.settingsWidgets.append([analysisColourLabel, analysisColourEntry])
+
 		noOfPlotsBaseLabel = tk.Label(settingsFrame, text="Number of Plots")
 		noOfPlotsBaseEntry = tk.Entry(settingsFrame)
 		noOfPlotsBaseEntry.insert(0, options["noOfPlotsBase"])
 		self.settingsWidgets.append([noOfPlotsBaseLabel, noOfPlotsBaseEntry])
 
+		maxFrameRateLabel = tk.Label(settingsFrame, text="Max Frame Rate")
+		maxFrameRateEntry = tk.Entry(settingsFrame)
+		maxFrameRateEntry.insert(0, options["maxFrameRate"])
+		self.settingsWidgets.append([maxFrameRateLabel, maxFrameRateEntry])
+
+		frameBudgetLabel = tk.Label(settingsFrame, text="Frame Time Budget (ms)")
+		frameBudgetEntry = tk.Entry(settingsFrame)
+		frameBudgetEntry.insert(0, options["frameBudget"])
+		self.settingsWidgets.append([frameBudgetLabel, frameBudgetEntry])
+
+		self.statsOverlayToggle = tk.IntVar()
+		self.statsOverlayToggle.set(options["statsOverlay"])
+		statsOverlayLabel = tk.Label(settingsFrame, text="Frame Stats Overlay")
+		statsOverlayCheckbox = tk.Checkbutton(settingsFrame, variable = self.statsOverlayToggle)
+		self.settingsWidgets.append([statsOverlayLabel, statsOverlayCheckbox, self.statsOverlayToggle])
+
+		statsFileLabel = tk.Label(settingsFrame, text="Frame Stats File")
+		statsFileEntry = tk.Entry(settingsFrame)
+		statsFileEntry.insert(0, options["statsFile"])
+		self.settingsWidgets.append([statsFileLabel, statsFileEntry])
+
 		for row in range(len(self.settingsWidgets)):
 			for i in range(2):
 				self.settingsWidgets[row][i].grid(row=row, column=i)
@@ -242,23 +306,33 @@ class guiController():
 		# Names of the settings; they will always be in this order
 		settingNames = ("windowWidth", "gridWidth", "windowHeight", "axisThickness",
 		 "axisColour", "plottedColour", "plottedThickness", "backgroundColour", "guidelines",
-		"guidelineColour", "guidelineFontSize", "guidelineThickness", "fontColour", "noOfPlotsBase", "noOfPlots")
+		"guidelineColour", "guidelineFontSize", "guidelineThickness", "fontColour", "analysis", "analysisColour", "noOfPlotsBase", "maxFrameRate",
+		"frameBudget", "statsOverlay", "statsFile")
 
-		for settingNum in range(14):
+		for settingNum in range(len(settingNames)):
 			
 			# If the widget is a text entry, it reads the text.
 			if type(self.settingsWidgets[settingNum][1]) is tk.Entry:
 				settings[settingNames[settingNum]] = self.settingsWidgets[settingNum][1].get()
 
-			# If the widget is a checkbox, it reads the status of the checkbox variable.
+			# If the widget is a checkbox, it reads the status of the checkbox variable stored after it.
 			elif type(self.settingsWidgets[settingNum][1]) is tk.Checkbutton:
-				settings[settingNames[settingNum]] = self.guidelinesToggle.get()
+				settings[settingNames[settingNum]] = self.settingsWidgets[settingNum][2].get()
 
 		validatedSettings = self.validateSettings(settings)
 
 		if validatedSettings != False:
+			# Options that aren't in the settings window (such as sampleCacheMemory) are kept as they are in the file
+			try:
+				with open('options.json') as optionsFile:
+					savedOptions = json.load(optionsFile)
+			except (OSError, ValueError):
+				savedOptions = {}
+
+			savedOptions.update(validatedSettings)
+
 			with open('options.json', 'w') as optionsFile:
-				json.dump(validatedSettings, optionsFile)
+				json.dump(savedOptions, optionsFile)
 
 			dialogBox = tk.Toplevel()
 			dialogBox.title("Maths Graphing Tool")
@@ -279,13 +353,19 @@ class guiController():
 			settings["guidelines"] = int(settings["guidelines"])
 			settings["guidelineFontSize"] = int(settings["guidelineFontSize"])
 			settings["guidelineThickness"] = int(settings["guidelineThickness"])
+			settings["analysis"] = int(settings["analysis"])
 			settings["noOfPlotsBase"] = int(settings["noOfPlotsBase"])
+			settings["maxFrameRate"] = int(settings["maxFrameRate"])
+			settings["frameBudget"] = int(settings["frameBudget"])
+			settings["statsOverlay"] = int(settings["statsOverlay"])
+			settings["statsFile"] = settings["statsFile"].strip()
 
 			settings["axisColour"] = tuple([int(x) for x in settings["axisColour"].split(" ")])
 			settings["plottedColour"] = tuple([int(x) for x in settings["plottedColour"].split(" ")])
 			settings["backgroundColour"] = tuple([int(x) for x in settings["backgroundColour"].split(" ")])
 			settings["guidelineColour"] = tuple([int(x) for x in settings["guidelineColour"].split(" ")])
 			settings["fontColour"] = tuple([int(x) for x in settings["fontColour"].split(" ")])
+			settings["analysisColour"] = tuple([int(x) for x in settings["analysisColour"].split(" ")])
 
 		except ValueError:
 			valid = False
@@ -315,7 +395,27 @@ class guiController():
 			elif settings["noOfPlotsBase"] < 1:
 				valid = False
 
-			for colourSetting in ("axisColour", "plottedColour", "backgroundColour", "guidelineColour", "fontColour"):
+			elif settings["maxFrameRate"] < 1:
+				valid = False
+
+			elif settings["frameBudget"] < 1:
+				valid = False
+
+			elif settings["statsFile"] != "":
+				# The stats file is only created once the program is restarted with these settings, so for now it is only
+				# checked that it could be written to
+				statsFolder = os.path.dirname(settings["statsFile"]) or "."
+
+				if not os.path.isdir(statsFolder) or not os.access(statsFolder, os.W_OK):
+					valid = False
+
+				elif os.path.isdir(settings["statsFile"]):
+					valid = False
+
+				elif os.path.exists(settings["statsFile"]) and not os.access(settings["statsFile"], os.W_OK):
+					valid = False
+
+			for colourSetting in ("axisColour", "plottedColour", "backgroundColour", "guidelineColour", "fontColour", "analysisColour"):
 				for value in settings[colourSetting]:
 					if value > 255 or value < 0:
 						valid = False
@@ -325,7 +425,7 @@ class guiController():
 			warningRoot.title("Invalid Setting")
 			warningRoot.resizable(False, False)
 
-			warningLabel = tk.Label(warningRoot, text="One or more of your entered settings are invalid.\n\nPlease ensure that:\n- Size settings are numbers greater than 99.\n- Colours are three numbers between 0 and 255, seperated by a space (eg. 50 50 50).\n- Font sizes are above 0.\n- Thickness sizes are above 0.\n- Number of plots is above 0.\n- All settings are whole numbers, not decimals.")
+			warningLabel = tk.Label(warningRoot, text="One or more of your entered settings are invalid.\n\nPlease ensure that:\n- Size settings are numbers greater than 99.\n- Colours are three numbers between 0 and 255, seperated by a space (eg. 50 50 50).\n- Font sizes are above 0.\n- Thickness sizes are above 0.\n- Number of plots, max frame rate and frame time budget are above 0.\n- The stats file is a file in a folder that exists and can be written to.\n- All settings are whole numbers, not decimals.")
 			warningLabel.pack()
 			return False
 
@@ -348,6 +448,12 @@ class guiController():
 
 	def loadGraphs(self, path):
 
+		# The catalog of each folder is kept, so that only files that have changed are read when it is opened again
+		if path not in self.catalogs:
+			self.catalogs[path] = graphCatalog(path)
+		catalog = self.catalogs[path]
+		catalog.update()
+
 		examplesRoot = tk.Toplevel()
 		examplesRoot.title("Maths Graphing Load Graphs")
 		examplesRoot.resizable(False, False)
@@ -355,6 +461,10 @@ class guiController():
 		titleLabel = tk.Label(examplesRoot, text = "Load Graphs", font=("Helvetica", 16))
 		titleLabel.pack()
 
+		# The graphs shown are filtered by the text in the search box
+		searchEntry = tk.Entry(examplesRoot, font=("Helvetica", 11))
+		searchEntry.pack(fill=tk.X, padx=5)
+
 		examplesFrame = tk.Frame(examplesRoot, borderwidth=1, width=500, height=400)
 		examplesFrame.pack_propagate(0)
 		examplesFrame.pack(fill="both", expand=True)
@@ -365,59 +475,68 @@ class guiController():
 		examplesScrollbar.pack(fill=tk.Y, side=tk.RIGHT, expand=0)
 		examplesCanvas = tk.Canvas(scrollable, yscrollcommand=examplesScrollbar.set) # The yscrollcommand attribute links the canvas to the scrollbar
 		examplesCanvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=1)
-		examplesScrollbar.config(command=examplesCanvas.yview)
-
-		# Set the inital scroll values for the canvas
-		examplesCanvas.xview_moveto(0)
-		examplesCanvas.yview_moveto(0)
-
-		# The interior frame is created in the canvas, and will contain the widgets which will be moved when the user scrolls
-		interior = tk.Frame(examplesCanvas)
-		interior_id = examplesCanvas.create_window(0, 0, window=interior, anchor=tk.NW)
-
-		def configureInterior(event):
-			# Changes the size of the interior frame and the scrollable region of the canvas
-			size = (interior.winfo_reqwidth(), interior.winfo_reqheight())
-			examplesCanvas.config(scrollregion="0 0 %s %s" % size)
-			if interior.winfo_reqheight() != examplesCanvas.winfo_width():
-				examplesCanvas.config(width=interior.winfo_reqwidth())
-
-		# The interior frame will call the function configureInterior whenever it changes size
-		interior.bind('<Configure>', configureInterior)
-
-		def configureCanvas(event):
-			# Changes the interior frame's width to the width of the canvas
-			if interior.winfo_reqwidth() != examplesCanvas.winfo_width():
-				examplesCanvas.itemconfigure(interior_id, width=examplesCanvas.winfo_width())
-
-		# The canvas will call configureCanvas whenever it changes size
-		examplesCanvas.bind('<Configure>', configureCanvas)
 
 		scrollable.pack(fill=tk.BOTH, expand=1)
 
-		# Get a list of only the files in the current directory.
-		fileNames = [name for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))]
+		# Widgets are only created for the rows that fit in the canvas. When the canvas is scrolled, the rows are
+		# moved and given the graphs that are now visible, so a folder of thousands of graphs opens as quickly as a small one.
+		rowHeight = 52
+		rowCount = 400 // rowHeight + 2
+		rows = []
+		results = catalog.search("")
 
-		for fileName in fileNames:
-			# The full path of the file
-			filePath = os.path.join(path , fileName)
-
-			with open(filePath) as graphFile:
-				# Reading the contents of the file
-				graphData = json.load(graphFile)
-
-			# Create the gui for the file in the interior frame
-			graphFrame = tk.Frame(interior, borderwidth=1, relief="solid", width = 400, height = 50)
+		for rowNum in range(rowCount):
+			# Create the gui for a row in the canvas
+			graphFrame = tk.Frame(examplesCanvas, borderwidth=1, relief="solid", width = 400, height = 50)
 			graphFrame.pack_propagate(0)
 			graphFrame.grid_propagate(0)
-			graphEquationLabel = tk.Label(graphFrame, text=graphData["equation"], font=("Consolas", 12))
-			graphDescriptionLabel = tk.Label(graphFrame, text=graphData["description"], font=("Helvetica", 11))
-			graphButton = tk.Button(graphFrame, text="Select", command=lambda equation=graphData["equation"]: self.getEquationInput(equation))
+			graphFrame.equationLabel = tk.Label(graphFrame, font=("Consolas", 12))
+			graphFrame.descriptionLabel = tk.Label(graphFrame, font=("Helvetica", 11))
+			graphFrame.button = tk.Button(graphFrame, text="Select")
+
+			graphFrame.equationLabel.grid(row=0,column=0, padx=5)
+			graphFrame.descriptionLabel.grid(row=0,column=1, padx=5)
+			graphFrame.button.grid(row=0,column=2, padx=5, sticky=tk.E)
+
+			graphFrame.window = examplesCanvas.create_window(0, rowNum*rowHeight, window=graphFrame, anchor=tk.NW)
+			rows.append(graphFrame)
+
+		def showRows(*args):
+			# Give each row the graph at its position in the search results, starting from the first visible graph
+			firstGraph = int( examplesCanvas.canvasy(0) // rowHeight )
+
+			for rowNum in range(rowCount):
+				graphNum = firstGraph + rowNum
+				row = rows[rowNum]
+
+				if graphNum < len(results):
+					graphData = results[graphNum]
+					row.equationLabel.configure(text=graphData["equation"])
+					row.descriptionLabel.configure(text=graphData["description"])
+					row.button.configure(command=lambda equation=graphData["equation"]: self.getEquationInput(equation))
+					examplesCanvas.coords(row.window, 0, graphNum*rowHeight)
+					examplesCanvas.itemconfigure(row.window, state="normal")
+				else:
+					examplesCanvas.itemconfigure(row.window, state="hidden")
 
-			graphEquationLabel.grid(row=0,column=0, padx=5)
-			graphDescriptionLabel.grid(row=0,column=1, padx=5)
-			graphButton.grid(row=0,column=2, padx=5, sticky=tk.E)
-			graphFrame.pack()
+		def scroll(*args):
+			examplesCanvas.yview(*args)
+			showRows()
+
+		def search(event):
+			# Filter the graphs and scroll back to the top of the results
+			nonlocal results
+			results = catalog.search(searchEntry.get())
+			examplesCanvas.config(scrollregion="0 0 400 %s" % (len(results)*rowHeight))
+			examplesCanvas.yview_moveto(0)
+			showRows()
+
+		examplesScrollbar.config(command=scroll)
+		examplesCanvas.bind('<Configure>', showRows)
+		searchEntry.bind('<KeyRelease>', search)
+
+		# Set the inital scroll region and rows
+		search(None)
 
 	class equationFrame():
 		# Class that stores the equation object and the equation frame so that they are linked
@@ -426,46 +545,114 @@ class guiController():
 			self.frame.pack_forget()
 			self.frame.destroy()
 
-			equations.equationList.remove(self.linkedEquation)
-
-			if len(equations.equationList) > 0:
-				equations.calculateNoOfPlots( len(equations.equationList ) )
+			equations.removeEquation(self.linkedEquation)
 
 		def toggle(self):
 			# Toggle the visibility of the equation
 			self.linkedEquation.visible = not self.linkedEquation.visible
+			scheduler.markDirty()
+
+		def showStatus(self):
+			# Show that the equation is pending while it is still being solved, or invalid if its points couldn't be worked out
+			if not hasattr(self, "statusLabel"):
+				return
+
+			if self.linkedEquation.failed:
+				self.statusLabel.configure(text="Invalid", fg="red")
+				self.statusLabel.pack(side=tk.LEFT)
+			elif self.linkedEquation.pending:
+				self.statusLabel.pack(side=tk.LEFT)
+			else:
+				self.statusLabel.pack_forget()
+
+		def showInvalid(self):
+			# Remove the row of an equation that was solved but can't be drawn, and warn the user
+			self.frame.pack_forget()
+			self.frame.destroy()
+
+			warningRoot = tk.Toplevel()
+			warningLabel = tk.Label(warningRoot, text = "Invalid Graph\n\nPlease refer to the tutorial", font=("Helvetica", 15))
+			warningLabel.pack()
 
 	def newEquation(self):
 		self.getEquationInput(self.graphEntry.get("1.0", tk.END))
 
 	def getEquationInput(self, equation):
 		#Get the user's equation input and create the frame for the 'currently graphed' 
+		# sympy has to be imported before its errors can be caught below, which it may not be if it is entered straight away
+		loadSympy()
+
 		try:
 			eqFrame = gui.equationFrame()
 			newEquation = equations.createEquation(equation, eqFrame)
-			newEquation.solve(0)
-		except (NameError, sympy.SympifyError, SyntaxError):
+		except (NameError, ValueError, sympy.SympifyError, SyntaxError):
 			warningRoot = tk.Toplevel()
 			warningLabel = tk.Label(warningRoot, text = "Invalid Graph\n\nPlease refer to the tutorial", font=("Helvetica", 15))
 			warningLabel.pack()
-
-			equations.equationList.remove(newEquation)
 			del eqFrame
 		else:
-			eqFrame.frame = tk.Frame(self.interior, height=200, borderwidth=1, relief="solid")
-			eqFrame.text = tk.Text(eqFrame.frame, width = 12, height = 1, font=("Helvetica", 15))
+			self.createEquationFrame(eqFrame, equation)
+
+	def createEquationFrame(self, eqFrame, equation):
+		# Create the widgets of an equation in the 'currently graphed' list
+		eqFrame.frame = tk.Frame(self.interior, height=200, borderwidth=1, relief="solid")
+		eqFrame.text = tk.Text(eqFrame.frame, width = 12, height = 1, font=("Helvetica", 15))
+
+		eqFrame.text.insert('end', equation)
+		eqFrame.text.configure(state='disabled')
+		eqFrame.text.pack(side=tk.LEFT)
+
+		eqFrame.statusLabel = tk.Label(eqFrame.frame, text="Pending", fg="grey")
+		eqFrame.showStatus()
+
+		eqFrame.equationDeleteButton = tk.Button(eqFrame.frame, text="Delete", command=eqFrame.delete)
+		eqFrame.equationCheckbox = tk.Button(eqFrame.frame, text="Toggle", command=eqFrame.toggle)
 
-			eqFrame.text.insert('end', equation)
-			eqFrame.text.configure(state='disabled')
-			eqFrame.text.pack(side=tk.LEFT)
+		eqFrame.equationDeleteButton.pack(side=tk.RIGHT)
+		eqFrame.equationCheckbox.pack(side=tk.RIGHT, ipadx=3)
 
-			eqFrame.equationDeleteButton = tk.Button(eqFrame.frame, text="Delete", command=eqFrame.delete)
-			eqFrame.equationCheckbox = tk.Button(eqFrame.frame, text="Toggle", command=eqFrame.toggle)
+		eqFrame.frame.pack(fill=tk.X, expand=False, ipadx=1, ipady=5, pady=1)
+
+	def saveWorkspace(self):
+		# Save every plotted graph and the camera to a single file chosen by the user
+		path = filedialog.asksaveasfilename(title="Save Workspace", defaultextension=".workspace", filetypes=[("Workspaces", "*.workspace")])
+
+		if not path:
+			return
+
+		try:
+			saveWorkspace(path, options["workspaceSamples"] == 1)
+		except OSError:
+			warningRoot = tk.Toplevel()
+			warningLabel = tk.Label(warningRoot, text = "Could not save the workspace\n\nThe file may be open in another program", font=("Helvetica", 15))
+			warningLabel.pack()
+
+	def loadWorkspace(self):
+		# Replace the plotted graphs and the camera with those of a workspace file chosen by the user
+		path = filedialog.askopenfilename(title="Load Workspace", filetypes=[("Workspaces", "*.workspace")])
+
+		if not path:
+			return
+
+		# A damaged file can raise all sorts of errors while it is read, which are all reported in the same way
+		try:
+			loaded = loadWorkspace(path)
+		except Exception:
+			warningRoot = tk.Toplevel()
+			warningLabel = tk.Label(warningRoot, text = "Invalid Workspace\n\nThe file could not be loaded", font=("Helvetica", 15))
+			warningLabel.pack()
+			return
 
-			eqFrame.equationDeleteButton.pack(side=tk.RIGHT)
-			eqFrame.equationCheckbox.pack(side=tk.RIGHT, ipadx=3)
+		# The graphs that were plotted are only removed once the workspace has loaded, so they are kept if it can't be
+		for plotted in list(equations.equationList):
+			if plotted not in loaded:
+				plotted.frame.delete()
 
-			eqFrame.frame.pack(fill=tk.X, expand=False, ipadx=1, ipady=5, pady=1)
+		for newEquation in loaded:
+			eqFrame = gui.equationFrame()
+			eqFrame.linkedEquation = newEquation
+			newEquation.frame = eqFrame
+			self.createEquationFrame(eqFrame, newEquation.equationString)
 
 	def saveGraphs(self):
 
@@ -538,6 +725,33 @@ class gridController():
 
 		self.gridFont = pygame.font.SysFont("monospace", options["guidelineFontSize"])
 
+		# The axes, guidelines and markers are drawn onto their own surface, which is reused until the camera moves
+		self.gridLayer = pygame.Surface( self.graphSurface.get_size() )
+		self.gridLayerKey = None
+		self.gridLayerError = (0, 0) # Pixels that the grid layer is out of place by from being scrolled by whole pixels
+
+		# When the camera moves without zooming, layers are scrolled and only the uncovered strips are drawn, until they are
+		# out of place by more than this many pixels
+		self.maxScrollError = 0.25
+
+		self.labels = OrderedDict() # (text, colour) : rendered text, ordered from least to most recently used
+		self.labelCacheSize = 500
+
+		self.cursor = None # Position of the mouse on the screen, or None if the mouse isn't over the grid
+		self.cursorDistance = 8 # Distance in pixels from the mouse that a curve is counted as being under it
+
+		self.analysisRadius = 3 # Radius in pixels of the roots, turning points and intersections marked on the grid
+		self.analysisMarker = None # (colour, surface) of the circle copied onto each marked point
+		self.hoveredPoint = None # (kind, x, y) of the marked point that was under the mouse when the grid was last drawn
+
+	def setCamera(self, cameraX, cameraY, cameraWidth, cameraHeight):
+		# Move the camera and adjust the pixelDX and pixelDY to the new width and height
+		self.cameraX, self.cameraY = (cameraX, cameraY)
+		self.cameraWidth, self.cameraHeight = (cameraWidth, cameraHeight)
+
+		self.pixelDX = self.cameraWidth / options["gridWidth"]
+		self.pixelDY = self.cameraHeight / options["windowHeight"]
+
 	def getGridCoordinate(self, coordsTuple):
 		# Take an (x, y) tuple on the screen and return it's x, y value on the cartesian grid
 		x, y = coordsTuple #Unpack tuple
@@ -552,54 +766,121 @@ class gridController():
 		screenY = ((-y-self.cameraY)/self.pixelDY) + options["windowHeight"]/2
 		return ( screenX, screenY )
 
+	def getScreenCoordinates(self, xValues, yValues):
+		# Take arrays of x and y values on the grid and return arrays of their x and y values on the screen
+		screenX = ((xValues-self.cameraX)/self.pixelDX) + options["gridWidth"]/2
+		screenY = ((-yValues-self.cameraY)/self.pixelDY) + options["windowHeight"]/2
+		return ( screenX, screenY )
+
 	def drawGrid(self):
 				# Draws the entire grid
+		stats.begin("frame")
 
-				# graphSurface is cleared
-		self.graphSurface.fill(options["backgroundColour"])
+		# The axes, guidelines and markers are only redrawn when the camera or their options have changed. If only the camera's
+		# position has changed, the layer is scrolled instead and only the strips that are uncovered are drawn.
+		gridLayerKey = (self.cameraX, self.cameraY, self.cameraWidth, self.cameraHeight, options["guidelines"], options["guidelineColour"], options["axisColour"], options["axisThickness"], options["fontColour"], options["backgroundColour"])
+
+		if gridLayerKey != self.gridLayerKey:
+			stats.begin("gridLayer")
+			scroll = self.scrollOffset(gridLayerKey, self.gridLayerKey, self.gridLayerError)
+
+			if scroll is None:
+				self.drawGridLayer( self.gridLayer.get_rect() )
+				self.gridLayerError = (0, 0)
+			else:
+				(scrollX, scrollY), self.gridLayerError = scroll
+				self.gridLayer.scroll(scrollX, scrollY)
+
+				for area in self.exposedAreas( self.gridLayer.get_rect().move(scrollX, scrollY) ):
+					self.drawGridLayer(area)
+
+			self.gridLayerKey = gridLayerKey
+			stats.end("gridLayer")
+
+				# graphSurface is cleared by copying the grid layer onto it
+		stats.begin("composite")
+		self.graphSurface.blit(self.gridLayer, (0, 0))
+		stats.end("composite")
+
+		self.drawEquations()
+		self.drawAnalysis()
+
+		# The overlay shows the statistics of the previous frame, as this frame hasn't finished yet
+		stats.drawOverlay(self.graphSurface)
+
+				# Updates the display
+		stats.begin("flip")
+		pygame.display.flip()
+		stats.end("flip")
 
-		# Finds where the screen coordinate of where (0, 0) is
-		screenXZero, screenYZero = self.getScreenCoordinate( (0, 0) )
+		stats.end("frame")
+		stats.endFrame()
+
+	def drawGridLayer(self, area):
+		# Draws the background, axes, guidelines and markers onto an area of the grid layer
+		self.gridLayer.set_clip(area)
+		self.gridLayer.fill(options["backgroundColour"], area)
+
+		# Finds where the screen coordinate of where (0, 0) is. Screen coordinates are rounded to whole pixels, so that lines drawn
+		# into a strip exposed by scrolling land on the same pixels as a full redraw would put them.
+		screenXZero, screenYZero = map(round, self.getScreenCoordinate( (0, 0) ))
 
 		# Calls the calculate markers function to calulate the coordinates of the x and y markers
+		stats.begin("markers")
 		xMarkers = self.calculateMarkers( (self.cameraX - 0.5*self.cameraWidth), (self.cameraX + 0.5*self.cameraWidth), self.numXMarkers)
 		yMarkers = self.calculateMarkers( (self.cameraY - 0.5*self.cameraHeight), (self.cameraY + 0.5*self.cameraHeight), self.numYMarkers)
+		stats.end("markers")
 
 		
 		for x in xMarkers:
 			if x != 0:
 				# Find the screen coordinate of the marker
-				screenX, screenY = self.getScreenCoordinate( (x, 0) )
+				screenX, screenY = map(round, self.getScreenCoordinate( (x, 0) ))
 
 				# Draws the guidelines for the marker if toggled on
 				if options["guidelines"] == 1:
-					pygame.draw.line(self.graphSurface, options["guidelineColour"], (screenX,0), (screenX, options["windowHeight"]), 1)
+					pygame.draw.line(self.gridLayer, options["guidelineColour"], (screenX,0), (screenX, options["windowHeight"]), 1)
 
-				markerLabel = self.gridFont.render(str(x), 1, options["fontColour"])
-				textWidth, textHeight = self.gridFont.size(str(x))
+				markerLabel = self.getLabel(str(x))
+				textWidth, textHeight = markerLabel.get_size()
 
-				self.graphSurface.blit(markerLabel, (screenX-textWidth//2, screenY) )
+				self.gridLayer.blit(markerLabel, (screenX-textWidth//2, screenY) )
 
 		for y in yMarkers:
 			if y != 0:
-				screenX, screenY = self.getScreenCoordinate( (0, -y) )
+				screenX, screenY = map(round, self.getScreenCoordinate( (0, -y) ))
 				if options["guidelines"] == 1:
-					pygame.draw.line(self.graphSurface, options["guidelineColour"], (0,screenY), (options["gridWidth"], screenY), 1)
+					pygame.draw.line(self.gridLayer, options["guidelineColour"], (0,screenY), (options["gridWidth"], screenY), 1)
 
-				markerLabel = self.gridFont.render(str(y), 1, options["fontColour"])
-				textWidth, textHeight = self.gridFont.size(str(y))
+				markerLabel = self.getLabel(str(y))
+				textWidth, textHeight = markerLabel.get_size()
 
-				self.graphSurface.blit(markerLabel, (screenX, screenY-textHeight//2) )
+				self.gridLayer.blit(markerLabel, (screenX, screenY-textHeight//2) )
 
 		# Draw the axis lines onto the grid
-		pygame.draw.line(self.graphSurface, options["axisColour"], (screenXZero,0), (screenXZero,options["windowHeight"]), options["axisThickness"] )
-		pygame.draw.line(self.graphSurface, options["axisColour"], (0,screenYZero), (options["gridWidth"],screenYZero), options["axisThickness"] )
+		pygame.draw.line(self.gridLayer, options["axisColour"], (screenXZero,0), (screenXZero,options["windowHeight"]), options["axisThickness"] )
+		pygame.draw.line(self.gridLayer, options["axisColour"], (0,screenYZero), (options["gridWidth"],screenYZero), options["axisThickness"] )
 
-		self.drawEquations()
+		self.gridLayer.set_clip(None)
 
-				# Updates the display
-		pygame.display.flip()
-		gui.root.update()
+	def getLabel(self, text):
+		# Return the rendered text of a marker, only rendering it if it isn't already in the label cache
+		key = (text, tuple(options["fontColour"]))
+
+		if key in self.labels:
+			self.labels.move_to_end(key)
+			stats.count("labelCacheHits")
+		else:
+			stats.count("labelCacheMisses")
+			stats.begin("fonts")
+			self.labels[key] = self.gridFont.render(text, 1, options["fontColour"])
+			stats.end("fonts")
+
+			# Remove the least recently used labels once the cache is full
+			if len(self.labels) > self.labelCacheSize:
+				self.labels.popitem(last=False)
+
+		return self.labels[key]
 
 	def calculateMarkers(self, min, max, numOfMarkers):
 				# Calculates where the markers should be placed
@@ -634,48 +915,454 @@ class gridController():
 		return (fraction * (10**exponent))
 
 	def drawEquations(self):
-		# Draw every equation
+		# Draw every equation. The points of each equation's curve are worked out by the geometry worker whenever the camera
+		# has moved, and each equation is drawn onto its own layer from the newest points that have been worked out. A layer
+		# is only redrawn when the camera has moved or new points are ready, and the visible layers are then copied onto the grid.
+		camera = (self.cameraX, self.cameraY, self.cameraWidth, self.cameraHeight)
+		layerKey = camera + (options["plottedColour"], options["plottedThickness"], options["backgroundColour"])
+		equations.allocateSamples()
+		equations.worker.beginFrame()
 
 		for equation in equations.equationList:
 
-			if equation.visible:
+			if equation.pending or equation.failed or not equation.visible:
+				# The equation is still being solved, its points couldn't be worked out, or it has been toggled off
+				continue
 
-				# Generate a list of evenly spaced numbers from the left side of the screen to the right side.
-				xValues = numpy.linspace( (grid.cameraX - grid.cameraWidth//2)-1 , (grid.cameraX + grid.cameraWidth//2)+1, options["noOfPlots"]).tolist()
-				yValues = []
+			if equation.requested != layerKey:
+				equation.requested = layerKey
+				equations.worker.request(equation, camera)
 
-				for xValue in xValues:
+			if equation.geometry is None:
+				# No points have been worked out for the equation yet
+				continue
 
-					solution = equation.solve(xValue)
+			if equation.layerKey != layerKey or equation.layerGeometry is not equation.geometry:
+				stats.begin("equationLayers")
+				scroll = self.scrollOffset(layerKey, equation.layerKey, equation.layerError)
 
-					if solution == [sympy.zoo] or solution == [] or solution == None:
-						# sympy.zoo is the result of dividing something by zero, when this happens
-						# the solution at that x-value is undefined and cannot be plotted.
-						pass
+				if scroll is not None and self.canReuse(equation.layerGeometry, equation.geometry):
+					(scrollX, scrollY), equation.layerError = scroll
+					self.scrollEquationLayer(equation, scrollX, scrollY)
+					stats.count("layersScrolled")
+				else:
+					self.drawEquationLayer(equation)
+					equation.layerError = (0, 0)
+					stats.count("layersDrawn")
+
+				stats.end("equationLayers")
+
+				equation.layerKey, equation.layerGeometry = (layerKey, equation.geometry)
+
+			elif not equation.layerEncoded:
+				# Run-length encoding makes copying the mostly transparent layer much faster, but encoding it takes longer than
+				# copying it without, so a layer is only encoded once it is copied again without being redrawn
+				equation.layer.set_colorkey(options["backgroundColour"], pygame.RLEACCEL)
+				equation.layerEncoded = True
+
+			# Only the part of the layer that has been drawn on is copied
+			if equation.layerRect is not None:
+				stats.begin("composite")
+				self.graphSurface.blit(equation.layer, equation.layerRect, equation.layerRect)
+				stats.end("composite")
+
+	def drawAnalysis(self):
+		# Mark the roots, turning points and intersections of the visible equations, which are found by the geometry worker
+		# whenever the camera or the equations have changed. The newest points found are marked where they are with the
+		# camera as it is now, and the coordinates of the point under the mouse are shown next to it.
+		if options["analysis"] != 1:
+			self.hoveredPoint = None
+			return
+
+		camera = (self.cameraX, self.cameraY, self.cameraWidth, self.cameraHeight)
+		analysed = tuple( equation for equation in equations.equationList if equation.visible and not equation.pending and not equation.failed and not equation.implicit )
+
+		if equations.analysis.requested != (camera, analysed):
+			equations.analysis.requested = (camera, analysed)
+			equations.worker.requestAnalysis( (camera, analysed) )
+
+		marked = self.markedPoints()
+		if marked is None:
+			self.hoveredPoint = None
+			return
+
+		kinds, pointX, pointY, screenPoints = marked
+		stats.begin("analysisMarkers")
+
+		# A circle is drawn once and copied onto every point, which is much faster than drawing a circle for each of them
+		if self.analysisMarker is None or self.analysisMarker[0] != options["analysisColour"]:
+			marker = pygame.Surface( (2*self.analysisRadius + 1, 2*self.analysisRadius + 1), pygame.SRCALPHA )
+			pygame.draw.circle(marker, options["analysisColour"], (self.analysisRadius, self.analysisRadius), self.analysisRadius)
+			self.analysisMarker = (options["analysisColour"], marker)
+
+		corners = (screenPoints - self.analysisRadius).tolist()
+		self.graphSurface.blits( zip( [self.analysisMarker[1]] * len(corners), corners ), doreturn=False )
+
+		self.hoveredPoint = self.pointUnderCursor()
+		if self.hoveredPoint is not None:
+			kind, pointX, pointY = self.hoveredPoint
+			label = self.getLabel( "{} ({}, {})".format( curveAnalysis.kindNames[kind], self.formatCoordinate(pointX, self.pixelDX), self.formatCoordinate(pointY, self.pixelDY) ) )
+			screenX, screenY = map(round, self.getScreenCoordinate( (pointX, pointY) ))
+			self.graphSurface.blit(label, (screenX + self.analysisRadius + 2, screenY - label.get_height() - self.analysisRadius))
+
+		stats.end("analysisMarkers")
+		stats.count("analysisPoints", len(kinds))
+
+	def markedPoints(self):
+		# Return the kinds, the x and y values and an array of the screen coordinates (rounded to whole pixels) of the newest
+		# points found by the analysis that can be seen, or None if there aren't any. Points of equations that have since been
+		# hidden or deleted aren't marked.
+		with equations.analysis.lock:
+			latest = equations.analysis.latest
+
+		if latest is None:
+			return None
+
+		pointX, pointY, kinds, analysed, owners = latest
+
+		# Whether each analysed equation is still shown, with an extra True for the -1 of points that are on a single equation
+		shown = set( equation for equation in equations.equationList if equation.visible )
+		ownerShown = numpy.array( [ equation in shown for equation in analysed ] + [True], dtype=bool )
+		marked = ownerShown[owners[:, 0]] & ownerShown[owners[:, 1]]
+
+		screenX, screenY = self.getScreenCoordinates(pointX[marked], pointY[marked])
+		width, height = self.graphSurface.get_size()
+		onScreen = (screenX >= 0) & (screenX < width) & (screenY >= 0) & (screenY < height)
+
+		if not onScreen.any():
+			return None
+
+		screenPoints = numpy.rint( numpy.column_stack( (screenX[onScreen], screenY[onScreen]) ) ).astype(int)
+		return ( kinds[marked][onScreen], pointX[marked][onScreen], pointY[marked][onScreen], screenPoints )
+
+	def pointUnderCursor(self):
+		# Return (kind, x, y) of the marked point nearest to the mouse, or None if none are within a few pixels of it
+		marked = None if options["analysis"] != 1 or self.cursor is None else self.markedPoints()
+		if marked is None:
+			return None
+
+		kinds, pointX, pointY, screenPoints = marked
+		distances = numpy.hypot( screenPoints[:, 0] - self.cursor[0], screenPoints[:, 1] - self.cursor[1] )
+		nearest = int(numpy.argmin(distances))
+
+		if distances[nearest] > self.cursorDistance:
+			return None
+
+		return ( int(kinds[nearest]), float(pointX[nearest]), float(pointY[nearest]) )
+
+	def formatCoordinate(self, value, pixelSize):
+		# Return a coordinate of a marked point as text, which is shown as 0 if it is much less than a pixel from it
+		if abs(value) < pixelSize/1000:
+			value = 0
+
+		return "{:.4g}".format(value)
+
+	def drawEquationLayer(self, equation):
+		# Draw the newest points of an equation onto its layer, moved to where the camera is now.
+		# The layer is filled with the background colour, which is made transparent. Only the part that was drawn on last
+		# time is filled, unless the layer is new or the background colour has changed (the last item of its key).
+		if equation.layer is None or equation.layerKey is None or equation.layerKey[-1] != options["backgroundColour"]:
+			equation.layer = pygame.Surface( self.graphSurface.get_size() )
+			equation.layer.fill(options["backgroundColour"])
+
+		# The layer is drawn without run-length encoding, as every line drawn onto an encoded surface has to decode it first
+		equation.layer.set_colorkey(None)
+		if equation.layerRect is not None:
+			equation.layer.fill(options["backgroundColour"], equation.layerRect)
+
+		self.finishEquationLayer( equation, self.drawGeometry(equation) )
+
+	def scrollEquationLayer(self, equation, scrollX, scrollY):
+		# Move what has been drawn on an equation's layer by a whole number of pixels, and only draw the parts of the layer
+		# that its points weren't worked out for when they were drawn, such as the strip uncovered by moving it
+		equation.layer.set_colorkey(None)
+		if equation.layerEncoded:
+			# Scrolling a surface that has been run-length encoded scrambles its pixels, so an encoded layer is copied onto a
+			# new surface that isn't encoded first
+			layer = pygame.Surface( equation.layer.get_size() )
+			layer.blit(equation.layer, (0, 0))
+			equation.layer = layer
+
+		rects = []
+
+		if equation.layerRect is not None:
+			# Only the part of the layer that has been drawn on is moved, and whatever is left behind is cleared
+			moved = equation.layerRect.move(scrollX, scrollY)
+			scrolled = equation.layerRect.union(moved)
+
+			equation.layer.set_clip(scrolled)
+			equation.layer.scroll(scrollX, scrollY)
+			for area in self.exposedAreas(moved):
+				area = area.clip(scrolled)
+				if area.width > 0 and area.height > 0:
+					equation.layer.fill(options["backgroundColour"], area)
+
+			rects.append(moved)
+
+		equation.layer.set_clip(None)
+		areas = self.exposedAreas( equation.layerArea.move(scrollX, scrollY) )
+		for area in areas:
+			equation.layer.fill(options["backgroundColour"], area)
+
+		if areas != []:
+			rects += self.drawGeometry(equation, areas)
+
+		self.finishEquationLayer(equation, rects)
+
+	def finishEquationLayer(self, equation, rects):
+		# Record the parts of a layer that have been drawn on (which are all that is copied onto the grid and cleared next
+		# time) and that its points were worked out for, and make the background of the layer transparent
+		if rects == []:
+			equation.layerRect = None
+		else:
+			equation.layerRect = rects[0].unionall(rects[1:]).clip( equation.layer.get_rect() )
+
+		equation.layerArea = self.geometryArea(equation.geometry)
+
+		equation.layer.set_colorkey(options["backgroundColour"])
+		equation.layerEncoded = False
+
+	def drawGeometry(self, equation, areas=None):
+		# Draw the newest points of an equation onto its layer, returning the rectangles that were drawn on.
+		# If areas of the layer are given, only the points that can be drawn inside of them are drawn.
+		camera, points, complete, tiles = equation.geometry
+
+		if points is None:
+			# The equation couldn't be seen from the camera the points were worked out for
+			return []
+
+		if equation.implicit:
+			return self.drawPoints( self.moveScreenPoints(points, camera), equation.layer, areas )
+
+		xValues, yValues = points
+
+		if areas is not None:
+			# Only the samples across the columns of the areas, and the lines reaching into them from either side, can be drawn in them
+			margin = options["plottedThickness"] + 1
+			left = self.pixelDX*(min(area.left for area in areas) - margin - options["gridWidth"]/2) + self.cameraX
+			right = self.pixelDX*(max(area.right for area in areas) + margin - options["gridWidth"]/2) + self.cameraX
+			start, end = ( max(bisect.bisect_left(xValues, left) - 1, 0), bisect.bisect_left(xValues, right) + 1 )
+			xValues, yValues = ( xValues[start:end], yValues[:, start:end] )
+
+		# Every solution (such as the top and bottom halves of a circle) is drawn as its own curve.
+		# The time taken for each point is measured, as the equation controller limits the samples of slow curves.
+		startTime = time.perf_counter()
+		rects = []
+
+		for branch in yValues:
+			rects += self.drawCurve(xValues, branch, equation.layer, areas)
+
+		if yValues.size > 0:
+			pointSeconds = (time.perf_counter() - startTime) / yValues.size
+			equation.drawSeconds = pointSeconds if equation.drawSeconds is None else equation.drawSeconds + (pointSeconds - equation.drawSeconds) / 4
+
+		return rects
+
+	def scrollOffset(self, key, lastKey, error):
+		# Return the whole number of pixels (x, y) that a layer drawn for lastKey has to be scrolled by to be drawn for key,
+		# along with the error that scrolling by whole pixels has added up to, or None if the layer has to be redrawn instead.
+		# Keys start with the camera (x, y, width, height), and only its position can have changed. The layer is also redrawn
+		# once the error is more than maxScrollError pixels, or if it would be scrolled entirely off the screen.
+		if lastKey is None or key[2:] != lastKey[2:]:
+			return None
+
+		offsetX, offsetY = ( (lastKey[0] - key[0]) / self.pixelDX, (lastKey[1] - key[1]) / self.pixelDY )
+		scrollX, scrollY = ( round(offsetX), round(offsetY) )
+		errorX, errorY = ( error[0] + offsetX - scrollX, error[1] + offsetY - scrollY )
+		width, height = self.graphSurface.get_size()
+
+		if max(abs(errorX), abs(errorY)) > self.maxScrollError or abs(scrollX) >= width or abs(scrollY) >= height:
+			return None
+
+		return ( (scrollX, scrollY), (errorX, errorY) )
+
+	def exposedAreas(self, area):
+		# Return rectangles that cover the parts of the screen outside of an area, without overlapping each other
+		screen = self.graphSurface.get_rect()
+		area = area.clip(screen)
+
+		if area.width == 0 or area.height == 0:
+			return [screen]
+
+		areas = [ pygame.Rect(0, 0, screen.width, area.top), pygame.Rect(0, area.bottom, screen.width, screen.height - area.bottom),
+			pygame.Rect(0, area.top, area.left, area.height), pygame.Rect(area.right, area.top, screen.width - area.right, area.height) ]
+
+		return [ exposed for exposed in areas if exposed.width > 0 and exposed.height > 0 ]
+
+	def geometryArea(self, geometry):
+		# Return the part of the screen that the points of an equation were worked out for, where the camera is now
+		cameraX, cameraY, cameraWidth, cameraHeight = geometry[0]
+		left, top = ( (cameraX - self.cameraX) / self.pixelDX, (cameraY - self.cameraY) / self.pixelDY )
+		width, height = self.graphSurface.get_size()
+
+		return pygame.Rect( math.ceil(left), math.ceil(top), math.floor(left + width) - math.ceil(left), math.floor(top + height) - math.ceil(top) )
+
+	def canReuse(self, oldGeometry, newGeometry):
+		# Return whether a layer drawn from one set of points can be scrolled and drawn on with another, instead of being redrawn.
+		# This is the case if they are the same, or were both sampled from the same cached tiles wherever they overlap.
+		if newGeometry[0][2:] != (self.cameraWidth, self.cameraHeight):
+			return False
+
+		if oldGeometry is newGeometry:
+			return True
+
+		if oldGeometry is None or oldGeometry[3] is None or newGeometry[3] is None:
+			return False
+
+		(oldLevel, oldTiles), (newLevel, newTiles) = (oldGeometry[3], newGeometry[3])
+
+		return oldLevel == newLevel and all( oldTiles[index] is newTiles[index] for index in oldTiles.keys() & newTiles.keys() )
+
+	def calculateGeometry(self, equation, camera, deadline=math.inf):
+		# Work out the points of an equation's curve for a camera (x, y, width, height), returning (camera, points, complete, tiles).
+		# The points of an explicit equation are its x values and y values, and those of an implicit equation are coordinates
+		# on the screen of that camera. complete is False if any of the curve came from less accurate samples, because
+		# sampling it fully would have passed the deadline. tiles is the level (a level in each direction for an implicit
+		# equation) and the cached tiles that the points were sampled from, which lets the grid tell whether a layer drawn
+		# from other points can be reused, or None.
+		# This is called by the geometry worker, which may be in another thread, so only the camera it is given is used.
+		cameraX, cameraY, cameraWidth, cameraHeight = camera
+		pixelDX, pixelDY = (cameraWidth / options["gridWidth"], cameraHeight / options["windowHeight"])
+
+		if equation.implicit:
+			return (camera,) + self.calculateImplicit(equation, camera, deadline)
+
+		# The x values that can be seen, with a pixel added on each side so the curve reaches the edges of the screen
+		xMin, xMax = (cameraX - cameraWidth/2 - pixelDX, cameraX + cameraWidth/2 + pixelDX)
 
-					else:
+		# The y values that can be seen, with the thickness of the curve added, as the camera's y is upside down
+		margin = options["plottedThickness"] * pixelDY
+		yMin, yMax = (-cameraY - cameraHeight/2 - margin, -cameraY + cameraHeight/2 + margin)
 
-						yValues.append(solution[0])
+		# Equations that can be shown to be entirely above or below the screen aren't sampled at all
+		if not equation.samples.canBeSeen(xMin, xMax, pixelDX, yMin, yMax):
+			return (camera, None, True, None)
 
-				# This is outside the loop to avoid unnecessary calculations.
-				x, y = grid.getScreenCoordinate( (xValues[0], yValues[0]) )
+		# Get samples from the left side of the screen to the right side, which are placed more densely where the
+		# curve bends. Samples that have already been calculated are reused from the equation's cache, so only
+		# newly visible parts are solved. Undefined points are NaN so they stay aligned with their x-value.
+		xValues, yValues = equation.samples.getSamples(xMin, xMax, pixelDX, pixelDY, yMin, yMax, deadline)
 
-				for i in range(len(xValues)-1):
+		return (camera, (xValues, yValues), not equation.samples.missing, equation.samples.lastTiles)
 
-					if i+1 >= len(yValues):
-						break
+	def calculateImplicit(self, equation, camera, deadline=math.inf):
+		# Find the points of a relation that couldn't be solved for y across the screen of a camera, which are cached by the
+		# equation in tiles, returning (points, complete, tiles) like calculateGeometry. The points are coordinates on the screen.
+		cameraX, cameraY, cameraWidth, cameraHeight = camera
+		pixelDX, pixelDY = (cameraWidth / options["gridWidth"], cameraHeight / options["windowHeight"])
 
-					nextX, nextY = grid.getScreenCoordinate( (xValues[i+1], yValues[i+1]) )
+		# The grid coordinates that can be seen, with the thickness of the curve added on each side, as the camera's y is upside down
+		marginX, marginY = (options["plottedThickness"] * pixelDX, options["plottedThickness"] * pixelDY)
+		xValues, yValues = equation.samples.getPoints( cameraX - cameraWidth/2 - marginX, cameraX + cameraWidth/2 + marginX,
+			-cameraY - cameraHeight/2 - marginY, -cameraY + cameraHeight/2 + marginY, pixelDX, pixelDY, deadline )
 
-					if nextY > 10000:
-						nextY = 10000
-					elif nextY < -10000:
-						nextY = -10000
+		points = numpy.column_stack( ( (xValues - cameraX) / pixelDX + options["gridWidth"]/2, (-yValues - cameraY) / pixelDY + options["windowHeight"]/2 ) )
 
-					pygame.draw.line(grid.graphSurface, options["plottedColour"], (x, y), (nextX, nextY), options["plottedThickness"])
+		return (points, not equation.samples.missing, equation.samples.lastTiles)
 
+	def underCursor(self, equation):
+		# Return whether the newest points of an explicit equation pass within a few pixels of the mouse
+		if self.cursor is None or equation.implicit or equation.geometry is None or equation.geometry[1] is None:
+			return False
+
+		xValues, yValues = equation.geometry[1]
+		cursorX = self.pixelDX*(self.cursor[0] - options["gridWidth"]/2) + self.cameraX
+
+		# The curve is drawn as straight lines between its samples, so the line between the samples on either side of
+		# the mouse passes near it if the mouse is between their heights
+		index = numpy.searchsorted(xValues, cursorX)
+		screenX, screenY = self.getScreenCoordinates( xValues[max(index-1, 0) : index+1], yValues[:, max(index-1, 0) : index+1] )
+
+		if screenY.shape[1] == 0:
+			return False
+
+		with numpy.errstate(invalid="ignore"):
+			return bool( numpy.any( (numpy.min(screenY, axis=1) - self.cursorDistance <= self.cursor[1]) & (numpy.max(screenY, axis=1) + self.cursorDistance >= self.cursor[1]) ) )
+
+	def moveScreenPoints(self, points, camera):
+		# Move an array of coordinates on the screen of a camera (x, y, width, height) to where they are on the screen now
+		if camera == (self.cameraX, self.cameraY, self.cameraWidth, self.cameraHeight):
+			return points
+
+		cameraX, cameraY, cameraWidth, cameraHeight = camera
+		gridX = cameraWidth/options["gridWidth"]*(points[:, 0] - options["gridWidth"]/2) + cameraX
+		gridY = -(cameraHeight/options["windowHeight"]*(points[:, 1] - options["windowHeight"]/2) + cameraY)
+
+		return numpy.column_stack( self.getScreenCoordinates(gridX, gridY) )
+
+	def drawPoints(self, points, surface, areas=None):
+		# Colour the pixels at an array of screen coordinates, as squares the size of the plotted thickness, only inside of
+		# areas of the surface if they are given. Returns the rectangle that was drawn on, in a list so that it matches drawCurve.
+		points = numpy.floor(points).astype(int)
+		thickness = options["plottedThickness"]
+		offsets = numpy.arange(thickness) - thickness//2
+
+		pixelX, pixelY = numpy.broadcast_arrays( points[:, 0, None, None] + offsets[None, :, None], points[:, 1, None, None] + offsets[None, None, :] )
+		pixelX, pixelY = pixelX.ravel(), pixelY.ravel()
+
+		if areas is None:
+			areas = [ surface.get_rect() ]
+
+		inside = numpy.zeros(pixelX.shape, dtype=bool)
+		for area in areas:
+			inside |= (pixelX >= area.left) & (pixelX < area.right) & (pixelY >= area.top) & (pixelY < area.bottom)
+
+		# The surface stays locked until the pixel array is deleted
+		pixels = pygame.surfarray.pixels2d(surface)
+		pixelX, pixelY = pixelX[inside], pixelY[inside]
+		pixels[pixelX, pixelY] = surface.map_rgb(options["plottedColour"])
+		del pixels
+
+		stats.count("drawCalls")
+
+		if len(pixelX) == 0:
+			return []
+
+		left, top = ( int(pixelX.min()), int(pixelY.min()) )
+		return [ pygame.Rect( left, top, int(pixelX.max()) - left + 1, int(pixelY.max()) - top + 1 ) ]
+
+	def drawCurve(self, xValues, yValues, surface, areas=None):
+		# Draw a curve onto a surface through arrays of grid coordinates, using one line call for each continuous visible part of the curve.
+		# If areas of the surface are given, the curve is only drawn inside of them. Returns the rectangles that were drawn on.
+		screenX, screenY = self.getScreenCoordinates(xValues, yValues)
+
+		# Keep points that are far off the screen within a range that pygame can draw
+		screenY = numpy.clip(screenY, -10000, 10000)
+
+		# A line between two samples is only drawn if both are defined, and if they aren't both past the same edge of the screen.
+		with numpy.errstate(invalid="ignore"):
+			defined = numpy.isfinite(screenY)
+			above, below = screenY < 0, screenY > options["windowHeight"]
+			left, right = screenX < 0, screenX > options["gridWidth"]
+
+		drawn = defined[:-1] & defined[1:] & ~(above[:-1] & above[1:]) & ~(below[:-1] & below[1:]) & ~(left[:-1] & left[1:]) & ~(right[:-1] & right[1:])
+
+		# A line from past one edge of the screen to past the opposite edge, between samples less than a pixel apart, is an
+		# asymptote (such as in tan(x) or 1/x) that the samples were refined across, so the curve is broken there instead.
+		# Steep curves that are straight aren't refined, so their samples stay further apart and they are still drawn.
+		crossing = (above[:-1] & below[1:]) | (below[:-1] & above[1:])
+		drawn &= ~( crossing & (numpy.abs(numpy.diff(screenX)) < 1) )
 
-					x, y = nextX, nextY
+		# Find the first and last line of every run of lines that are drawn
+		edges = numpy.diff( numpy.concatenate( ([0], drawn.astype(numpy.int8), [0]) ) )
+		starts = numpy.flatnonzero(edges == 1)
+		ends = numpy.flatnonzero(edges == -1)
+
+		# Points are rounded to whole pixels, so that a curve drawn in parts lines up with a scrolled copy of itself
+		points = numpy.rint( numpy.column_stack( (screenX, screenY) ) )
+
+		lines = [ points[start:end+1].tolist() for start, end in zip(starts, ends) ]
+		rects = []
+
+		stats.begin("lines")
+		for area in ( [None] if areas is None else areas ):
+			surface.set_clip(area)
+			rects += [ pygame.draw.lines(surface, options["plottedColour"], False, line, options["plottedThickness"]) for line in lines ]
+		surface.set_clip(None)
+		stats.end("lines")
+		stats.count("drawCalls", len(rects))
+
+		return rects
 
 class inputHandler():
 	def __init__(self):
@@ -693,6 +1380,7 @@ class inputHandler():
 
 				# Get the current state of the mouse
 		(self.keys["m1"], self.keys["m2"], self.keys["m3"]) = pygame.mouse.get_pressed()
+		grid.cursor = pygame.mouse.get_pos() if pygame.mouse.get_focused() else None
 
 		for event in eventList:
 
@@ -701,6 +1389,13 @@ class inputHandler():
 				gui.root.destroy()
 				sys.exit(0)
 
+			if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, geometryWorker.readyEvent):
+				scheduler.markDirty()
+
+			# The coordinates of a marked point are shown while the mouse is over it
+			if event.type == pygame.MOUSEMOTION and grid.pointUnderCursor() != grid.hoveredPoint:
+				scheduler.markDirty()
+
 			if event.type == pygame.MOUSEBUTTONDOWN:
 								# If the user has the left mouse button pressed, it will call get_rel()
 								# which calculates the difference in the position of the mouse since the
@@ -716,10 +1411,10 @@ class inputHandler():
 					self.zoom("in")
 
 		if self.keys["m1"] == 1:
-			self.moveGraph()
+			self.moveGraph(*pygame.mouse.get_rel())
 
-	def moveGraph(self):
-		(x, y) = pygame.mouse.get_rel()
+	def moveGraph(self, x, y):
+				# Moves the camera by the movement of the mouse, (x, y) in pixels.
 
 				# Converts the screen coordinates of the mouse movement to graph coordinates.
 		xMovement = x*grid.pixelDX
@@ -728,6 +1423,9 @@ class inputHandler():
 		grid.cameraX -= xMovement
 		grid.cameraY -= yMovement
 
+		if (x, y) != (0, 0):
+			scheduler.markDirty()
+
 	def zoom(self, direction):
 				# Adjusts the width and height of the camera and adjusts the pixelDX and pixelDY accordingly.
 		if direction == "in":
@@ -743,29 +1441,759 @@ class inputHandler():
 		grid.pixelDX = grid.cameraWidth / options["gridWidth"]
 		grid.pixelDY = grid.cameraHeight / options["windowHeight"]
 
+		scheduler.markDirty()
+
+class renderScheduler():
+	# Decides when the grid needs to be redrawn, so that nothing is drawn while nothing has changed
+	def __init__(self):
+		self.dirty = True # The first frame always has to be drawn
+		self.lastFrame = 0
+
+	def markDirty(self):
+		# Request the grid to be redrawn. Any requests made before the next frame are combined into that frame.
+		self.dirty = True
+
+	def drawFrame(self):
+		# Redraw the grid if something has changed, as long as it won't exceed the maximum frame rate
+		if self.dirty and time.perf_counter() - self.lastFrame >= 1/options["maxFrameRate"]:
+			self.dirty = False
+			self.lastFrame = time.perf_counter()
+			grid.drawGrid()
+
+	def wait(self):
+		# Wait until there is something to do
+		frameTime = 1/options["maxFrameRate"]
+
+		if self.dirty:
+			# A frame is waiting to be drawn, so only wait until the frame rate allows it
+			remaining = self.lastFrame + frameTime - time.perf_counter()
+			if remaining > 0:
+				time.sleep(remaining)
+
+		elif not equations.worker.idle():
+			# Nothing needs to be drawn or sampled, so block until pygame receives an event. The wait is limited to one
+			# frame so that tkinter events are still handled with the same latency.
+			event = pygame.event.wait( int(frameTime*1000) )
+
+			# The event is put back in the queue to be handled by the input handler
+			if event.type != pygame.NOEVENT:
+				pygame.event.post(event)
+
+class frameStats():
+	# Records how long each stage of drawing a frame takes and counts the work done in it, such as samples solved and lines drawn.
+	# Stages can be nested, so a stage's time includes any stages inside it. Unless the overlay or the stats file is turned on,
+	# every method returns straight away so that the program isn't slowed down.
+	def __init__(self):
+		self.enabled = options["statsOverlay"] == 1 or options["statsFile"] != ""
+
+		self.stages = {} # stage : seconds spent on the stage during the current frame
+		self.counters = {} # counter : total during the current frame
+		self.lock = threading.Lock() # Held while the stages and counters are changed, since the geometry worker adds to them too
+		self.threadStages = threading.local() # Holds a dict of stage : time that the stage was last started, for each thread
+
+		self.lastStages, self.lastCounters = ({}, {}) # Statistics of the last frame drawn, shown by the overlay
+		self.frameTimes = [] # Times that the frames in the last second were drawn, to find the frame rate
+
+		self.statsFile = None
+		self.font = None
+
+		self.startup = {} # Phase of starting the program : seconds it took
+		self.lastPhase = startTime
+
+	def phase(self, name):
+		# Record how long a phase of starting the program took, since the previous phase finished
+		now = time.perf_counter()
+		self.startup[name] = now - self.lastPhase
+		self.lastPhase = now
+
+	def finishStartup(self):
+		# Add the time taken by each phase of starting the program to the stats file
+		if options["statsFile"] != "":
+			milliseconds = { name: seconds*1000 for name, seconds in self.startup.items() }
+			self.writeLine({ "time": time.time(), "startup": milliseconds })
+
+	def writeLine(self, data):
+		# Add a line of JSON to the stats file. If the file can't be written to (such as if its folder has been deleted),
+		# the statistics stop being written instead of stopping the program.
+		try:
+			if self.statsFile is None:
+				# Each line is written straight to the file, so nothing is lost when the program is closed
+				self.statsFile = open(options["statsFile"], 'a', buffering=1)
+
+			self.statsFile.write(json.dumps(data) + "\n")
+
+		except OSError:
+			options["statsFile"] = ""
+			self.enabled = options["statsOverlay"] == 1
+
+	def startTimes(self):
+		# Return the start times of the stages of the current thread, so that a stage run by two threads at once is timed
+		# separately in each of them
+		if not hasattr(self.threadStages, "started"):
+			self.threadStages.started = {}
+
+		return self.threadStages.started
+
+	def begin(self, stage):
+		if self.enabled:
+			self.startTimes()[stage] = time.perf_counter()
+
+	def end(self, stage):
+		if self.enabled:
+			seconds = time.perf_counter() - self.startTimes().pop(stage)
+			with self.lock:
+				self.stages[stage] = self.stages.get(stage, 0) + seconds
+
+	def count(self, counter, amount=1):
+		if self.enabled:
+			with self.lock:
+				self.counters[counter] = self.counters.get(counter, 0) + amount
+
+	def endFrame(self):
+		# Finish the statistics of a frame, adding them to the stats file if there is one
+		if not self.enabled:
+			return
+
+		now = time.perf_counter()
+		self.frameTimes = [frameTime for frameTime in self.frameTimes if now - frameTime < 1] + [now]
+
+		# The statistics are swapped for empty ones, so that the geometry worker only adds to the next frame's while they are written
+		with self.lock:
+			self.lastStages, self.lastCounters = (self.stages, self.counters)
+			self.stages, self.counters = ({}, {})
+
+		if options["statsFile"] != "":
+			milliseconds = { stage: seconds*1000 for stage, seconds in self.lastStages.items() }
+			self.writeLine({ "time": time.time(), "stages": milliseconds, "counters": self.lastCounters })
+
+	def drawOverlay(self, surface):
+		# Draw the frame rate and the statistics of the last frame in the top-left corner of the grid
+		if not self.enabled or options["statsOverlay"] != 1:
+			return
+
+		if self.font is None:
+			self.font = pygame.font.SysFont("monospace", options["guidelineFontSize"])
+
+		lines = [ "FPS: {}".format(len(self.frameTimes)) ]
+		if self.startup != {}:
+			lines.append( "startup: {:.0f} ms".format(sum(self.startup.values())*1000) )
+		lines += [ "{}: {:.2f} ms".format(stage, seconds*1000) for stage, seconds in sorted(self.lastStages.items()) ]
+		lines += [ "{}: {}".format(counter, total) for counter, total in sorted(self.lastCounters.items()) ]
+
+		rendered = [ self.font.render(line, 1, options["fontColour"], options["backgroundColour"]) for line in lines ]
+		lineHeight = self.font.get_linesize()
+
+		for lineNum in range(len(rendered)):
+			surface.blit(rendered[lineNum], (4, 4 + lineNum*lineHeight))
+
 class equationController():
 	def __init__(self):
 		self.equationList = []
 
-	def createEquation(self, function, frame):
-		# Create a new equation object and links the frame parameter to the equation
+		# Equations are solved for y in a pool of processes, so that slow equations don't freeze the program.
+		# The pool is only started once it is first needed.
+		self.solverPool = None
+		self.solving = {} # equation : (result from the pool, time the equation was submitted)
+
+		self.solutions = solutionCache("solutionCache.db")
+		self.plan = evaluationPlan()
+		self.worker = geometryWorker()
+		self.analysis = curveAnalysis()
+
+		# The samples each equation can add while refining are divided from a budget of time, which is adjusted every frame
+		self.refinementFrames = 10 # Number of frame time budgets that refining every curve across the screen should take
+		self.minNoOfPlots = 4 # Fewest samples an equation can add per 32 pixels, however slow it is
+		self.recentSeconds = 3 # Seconds after an equation is added that it is given a larger share of the budget
+
+	def createEquation(self, function, frame=None, background=True, solutions=None):
+		# Create a new equation object and links the frame parameter to the equation.
+		# If background is False, the equation is solved before returning instead of in the solver pool, with the same timeout.
+		# If the solutions are given (such as from a workspace file), the equation isn't solved at all.
 		newEquation = equation(function)
-		frame.linkedEquation = newEquation
+		if frame is not None:
+			frame.linkedEquation = newEquation
 		newEquation.frame = frame
 		self.equationList.append(newEquation)
-		self.calculateNoOfPlots( len(self.equationList ) )
+
+		# Equations that have been solved before are compiled straight away. If they can't be compiled, they are removed
+		# again and the ValueError is raised.
+		if solutions is None:
+			solutions = self.solutions.get(newEquation)
+
+		if solutions is not None:
+			self.finishEquation(newEquation, solutions)
+		elif background:
+			self.submitEquation(newEquation)
+		else:
+			# An equation that takes too long to solve is drawn implicitly, like one that times out in the solver pool
+			try:
+				solutions = solveWithTimeout(newEquation.leftSide, newEquation.rightSide)
+			except Exception:
+				solutions = []
+			else:
+				self.solutions.put(newEquation, solutions)
+
+			self.finishEquation(newEquation, solutions)
+
+		scheduler.markDirty()
 
 		return newEquation
 
-	def calculateNoOfPlots(self, equations):
-		# Update the amount of calculations to make for each equation, when there are n equations
+	def submitEquation(self, equation):
+		# Start solving an equation for y in the background
+		if self.solverPool is None:
+			self.solverPool = multiprocessing.Pool(os.cpu_count(), initializer=initSolver)
+
+		result = self.solverPool.apply_async(solveRelation, (equation.leftSide, equation.rightSide))
+		self.solving[equation] = (result, time.perf_counter())
+
+	def cancelSolving(self, equation):
+		# Stop waiting for an equation to be solved. Its result is ignored if it is still being solved.
+		self.solving.pop(equation, None)
+
+	def removeEquation(self, equation):
+		# Remove a plotted equation, and free the memory used by its samples
+		self.equationList.remove(equation)
+		self.cancelSolving(equation)
+
+		if not equation.pending:
+			with self.worker.lock:
+				equation.samples.clear()
+
+		# The points found for the equation hold on to it, and with it its layer and samples, so they are forgotten too
+		self.plan.forget(equation)
+		self.analysis.forget(equation)
+		with self.worker.condition:
+			if self.worker.analysisRequest is not None and equation in self.worker.analysisRequest[1]:
+				self.worker.analysisRequest = None
+
+		scheduler.markDirty()
+
+	def update(self):
+		# Check the equations being solved in the background, and compile any that have finished
+		for equation in self.worker.takeFailures():
+			if equation.frame is not None:
+				equation.frame.showStatus()
+
+		finished = [] # (equation, solutions)
+		timedOut = []
+
+		for equation, (result, startTime) in list(self.solving.items()):
+			if result.ready():
+				del self.solving[equation]
+
+				try:
+					solutions = result.get()
+				except Exception:
+					# If sympy fails to solve the equation, it can still be drawn implicitly
+					solutions = []
+				else:
+					self.solutions.put(equation, solutions)
+
+				finished.append( (equation, solutions) )
+
+			elif time.perf_counter() - startTime > options["solveTimeout"]:
+				timedOut.append(equation)
+
+		for equation, solutions in finished + [ (equation, []) for equation in timedOut ]:
+			try:
+				self.finishEquation(equation, solutions)
+			except ValueError:
+				# The equation has been removed, and its row is replaced with a warning
+				if equation.frame is not None:
+					equation.frame.showInvalid()
+
+		if timedOut != []:
+			for equation in timedOut:
+				del self.solving[equation]
+
+			# A process can't be stopped while it is solving, so the pool is replaced and any other
+			# equations that were still being solved are started again.
+			self.solverPool.terminate()
+			self.solverPool = None
+
+			for equation in list(self.solving):
+				self.submitEquation(equation)
+
+	def prefetch(self):
+		# Sample a tile of a neighbouring level of detail for the first equation that needs one, so that zooming can
+		# use it straight away. Returns whether a tile was sampled.
+		# In the background thread, an equation that can't be sampled is given up on instead of stopping the thread
+		for equation in self.equationList:
+			if equation.visible and not equation.pending and not equation.failed and not equation.implicit:
+				try:
+					if equation.samples.prefetch():
+						return True
+				except Exception:
+					if self.worker.thread is None:
+						raise
+					self.worker.fail(equation)
+
+		return False
+
+	def finishEquation(self, equation, solutions):
+		# Compile a solved equation so that it can be drawn. Equations that can't be compiled are removed, and the ValueError is raised.
+		try:
+			equation.setSolutions(solutions)
+		except ValueError:
+			self.equationList.remove(equation)
+			raise
+
+		if equation.frame is not None:
+			equation.frame.showStatus()
+		scheduler.markDirty()
+
+	def allocateSamples(self):
+		# Divide the frame time budget between the visible equations, and set how many samples each equation can add per
+		# 32 pixels (its noOfPlots) from its share and how long its samples have been taking. A sample is drawn in every
+		# frame that the camera moves, but only solved once, and refining every curve across the screen should take a few
+		# frames. This is done every frame, so that the frame rate holds however many equations are plotted, and slow
+		# equations are drawn less finely instead.
+		explicit = [ equation for equation in self.equationList if equation.visible and not equation.pending and not equation.failed and not equation.implicit ]
+		priorities = [ self.priority(equation) for equation in explicit ]
+
+		budget = options["frameBudget"]/1000
+		intervals = options["gridWidth"] / sampleCache.budgetSpacing # Intervals across the screen that noOfPlots is for
+
+		for equation, priority in zip(explicit, priorities):
+			if equation.sampleSeconds is None:
+				# Nothing has been sampled yet, so the equation isn't limited until it has been measured
+				equation.noOfPlots = options["noOfPlotsBase"]
+			else:
+				share = budget * priority / sum(priorities)
+				sampleSeconds = equation.sampleSeconds / self.refinementFrames + (equation.drawSeconds or 0)
+				equation.noOfPlots = round( min( options["noOfPlotsBase"], max( self.minNoOfPlots, share / sampleSeconds / intervals ) ) )
+
+	def priority(self, equation):
+		# Return how large a share of the sampling budget an equation gets compared to the others. Curves that can be seen,
+		# that were added recently or that are under the mouse are given larger shares.
+		priority = 1
+
+		if equation.geometry is not None and equation.geometry[1] is not None:
+			priority *= 4
+
+		if time.perf_counter() - equation.addedTime < self.recentSeconds:
+			priority *= 2
+
+		if grid.underCursor(equation):
+			priority *= 4
+
+		return priority
+
+class geometryWorker():
+	# Works out the points of the equations' curves away from the main loop, so that slow equations don't hold up input or
+	# drawing. The grid draws the newest points that have been worked out for each equation, moved to wherever the camera
+	# is now, and asks for new points whenever the camera moves. Until start is called (such as when drawing to images),
+	# requests are worked out straight away instead.
+	readyEvent = pygame.event.custom_type() # Posted to the main loop whenever new points are ready
+
+	def __init__(self):
+		self.requests = {} # equation : camera, replaced if the camera moves again before the equation is worked out
+		self.analysisRequest = None # (camera, equations) to find the roots, turning points and intersections of, or None
+		self.lastRequest = 0 # Time that the points of an equation were last asked for
+		self.analysisDelay = 0.2 # Seconds since the last request before an analysis is started, so none are started while dragging
+		self.failures = [] # Equations whose points couldn't be worked out, which the main loop shows as invalid
+		self.condition = threading.Condition() # Guards the requests, and wakes the thread when one is made
+		self.lock = threading.Lock() # Held while the sample caches are being used, as working out points changes them
+		self.thread = None
+		self.stopping = False # Whether the background thread has been asked to stop
+		self.frameDeadline = math.inf # Time that requests worked out straight away during the current frame have to finish by
+
+	def start(self):
+		# Start working out requests in a background thread. numpy releases the GIL while it evaluates the equations,
+		# so the main loop keeps running while they are sampled.
+		self.thread = threading.Thread(target=self.run, daemon=True)
+		self.stopping = False
+		self.thread.start()
+
+	def stop(self):
+		# Stop the background thread once it has finished what it is working out, such as when the benchmark replaces the
+		# equation controller. Requests are worked out straight away again afterwards.
+		if self.thread is None:
+			return
+
+		with self.condition:
+			self.stopping = True
+			self.condition.notify()
+
+		self.thread.join()
+		self.thread = None
+
+	def request(self, equation, camera):
+		# Ask for the points of an equation for a camera. Any earlier request for the equation that hasn't been started is discarded.
+		if self.thread is None:
+			self.calculate(equation, camera)
+			return
+
+		with self.condition:
+			self.requests[equation] = camera
+			self.lastRequest = time.perf_counter()
+			self.condition.notify()
+
+	def requestAnalysis(self, key):
+		# Ask for the roots, turning points and intersections of some equations for a camera, as (camera, equations).
+		# These are only found once every curve has been worked out and the camera has stopped moving, and are given up on
+		# if anything else is asked for first.
+		if self.thread is None:
+			equations.analysis.calculate(key)
+			return
+
+		with self.condition:
+			self.analysisRequest = key
+			self.condition.notify()
+
+	def fail(self, equation):
+		# Stop drawing an equation whose points couldn't be worked out in the background thread
+		equation.failed = True
+
+		with self.condition:
+			self.failures.append(equation)
+
+		scheduler.markDirty()
+		self.wake()
+
+	def wake(self):
+		# Wake the main thread up to draw the frame that has been marked as dirty. If pygame's event queue is full the event
+		# is dropped, which is fine since the main thread never waits for longer than a frame.
+		try:
+			pygame.event.post( pygame.event.Event(self.readyEvent) )
+		except pygame.error:
+			pass
+
+	def takeFailures(self):
+		# Return the equations that have failed since this was last called
+		with self.condition:
+			failures, self.failures = (self.failures, [])
+
+		return failures
+
+	def settled(self):
+		# Return whether an analysis that has been asked for can be started
+		return self.analysisRequest is not None and time.perf_counter() - self.lastRequest >= self.analysisDelay
+
+	def interrupted(self):
+		# Return whether anything has been asked for since the analysis being worked out was started
+		return self.requests != {} or self.analysisRequest is not None or self.stopping
+
+	def beginFrame(self):
+		# Start the time budget of a frame, which is shared by every request worked out straight away during the frame.
+		# Once it has passed, curves are drawn less accurately and then refined over the following frames.
+		self.frameDeadline = time.perf_counter() + options["frameBudget"]/1000
+
+	def idle(self):
+		# Called by the main loop when it has nothing to do. Returns whether any work was done, so that it doesn't block.
+		# Tiles are prefetched in the background thread once it has started, instead of by the main loop.
+		if self.thread is None:
+			with self.lock:
+				return equations.prefetch()
+
+		return False
+
+	def run(self):
+		# Work out each request in the order they were made, and then any analysis that was asked for once the camera has
+		# stopped moving. When there are none, tiles are prefetched one at a time until there is nothing left to prefetch, and
+		# then the thread waits for the next request.
+		while not self.stopping:
+			with self.condition:
+				request, analysis = (None, None)
+				if self.requests != {}:
+					equation = next(iter(self.requests))
+					request = (equation, self.requests.pop(equation))
+				elif self.settled():
+					analysis, self.analysisRequest = (self.analysisRequest, None)
+
+			# An error in one request is caught, so that the thread keeps working out the others
+			if request is not None:
+				try:
+					self.calculate(*request)
+				except Exception:
+					self.fail(request[0])
+				continue
+
+			if analysis is not None:
+				stats.begin("analysis")
+				try:
+					finished = equations.analysis.calculate(analysis, self.interrupted)
+				except Exception:
+					# Nothing is marked for these equations and camera, and it isn't tried again until they change
+					finished = False
+					analysis = None
+				stats.end("analysis")
+
+				if finished:
+					scheduler.markDirty()
+					self.wake()
+				elif analysis is not None:
+					# The analysis is started again once the requests that interrupted it are done, unless a newer one replaced it
+					with self.condition:
+						if self.analysisRequest is None:
+							self.analysisRequest = analysis
+				continue
+
+			with self.lock:
+				prefetched = equations.prefetch()
+
+			if not prefetched:
+				with self.condition:
+					while self.requests == {} and not self.settled() and not self.stopping:
+						self.condition.wait( None if self.analysisRequest is None else self.analysisDelay )
+
+	def calculate(self, equation, camera):
+		# Work out the points of an equation and replace its newest points with them, which are then drawn in the next frame
+		if equation not in equations.equationList or equation.failed:
+			# The equation was deleted after it was requested, or its points couldn't be worked out before
+			return
+
+		# In the background thread each request has its own time budget, so that a less accurate curve is shown quickly
+		# before it is refined, while requests worked out straight away share the budget of the frame
+		if self.thread is None:
+			deadline = self.frameDeadline
+		else:
+			deadline = time.perf_counter() + options["frameBudget"]/1000
+
+		stats.begin("geometry")
+		with self.lock:
+			geometry = grid.calculateGeometry(equation, camera, deadline)
+		stats.end("geometry")
+
+		equation.geometry = geometry
+
+		if not geometry[2]:
+			# Some of the curve came from less accurate samples, so the points are asked for again in the next frame
+			equation.requested = None
+
+		scheduler.markDirty()
+
+		if self.thread is not None:
+			self.wake()
+
+class curveAnalysis():
+	# Finds the roots, turning points and intersections of the plotted equations that can be seen from a camera, which are
+	# marked on the grid. Every solution of every equation (and its gradient) is sampled across the screen at once, the
+	# places where a solution, a gradient or the difference between two solutions changes sign between neighbouring
+	# samples are found with array operations, and then every one of them is narrowed down to a point together.
+	# Points are found by the geometry worker, and the points found for the last few cameras are kept.
+	kindNames = ("Root", "Turning point", "Intersection")
+
+	def __init__(self):
+		self.results = OrderedDict() # (camera, equations) : points, ordered from least to most recently used
+		self.cacheSize = 16
+		# Newest points found as (x values, y values, kinds, equations, owners), or None. owners are the indexes in equations
+		# of the one or two equations that each point is on, with -1 as the second for points on a single equation.
+		self.latest = None
+		self.requested = None # (camera, equations) that points were last asked for
+		# Held while the results and the newest points are used, as they are changed by the geometry worker's thread while
+		# equations are forgotten and points are marked in the main thread
+		self.lock = threading.Lock()
+
+		self.spacing = 1 # Pixels between the samples that sign changes are looked for between
+		self.precision = 1e-6 # Pixels that each point is found to within
+		self.maxIterations = 60
+
+	def calculate(self, key, interrupted=lambda: False):
+		# Find the points of the equations for a camera, unless they were found recently, and make them the newest points.
+		# Returns False if interrupted() became True before the points were found, such as when the camera has moved again.
+		with self.lock:
+			if key in self.results:
+				self.results.move_to_end(key)
+				self.latest = self.results[key]
+				return True
+
+		points = self.findPoints(*key, interrupted)
+		if points is None:
+			return False
+
+		with self.lock:
+			# An equation deleted while its points were being found has already been forgotten, so they aren't kept
+			if any( analysed not in equations.equationList for analysed in key[1] ):
+				return True
+
+			self.results[key] = points
+			if len(self.results) > self.cacheSize:
+				self.results.popitem(last=False)
+
+			self.latest = points
+
+		return True
 
-		options["noOfPlots"] = (options["noOfPlotsBase"] * (math.log(equations) + 0.5772156649 + 1/(2*equations) - 1/(12*equations**2) )) / equations
-		options["noOfPlots"] = round(options["noOfPlots"])
+	def forget(self, equation):
+		# Remove every set of points found for an equation, such as when it is deleted
+		with self.lock:
+			for key in [ key for key in self.results if equation in key[1] ]:
+				del self.results[key]
+
+			if self.latest is not None and equation in self.latest[3]:
+				self.latest = None
+
+		if self.requested is not None and equation in self.requested[1]:
+			self.requested = None
+
+	def findPoints(self, camera, analysed, interrupted):
+		# Return the points of some equations that can be seen from a camera (x, y, width, height), or None if interrupted
+		cameraX, cameraY, cameraWidth, cameraHeight = camera
+		intervals = math.ceil(options["gridWidth"] / self.spacing)
+		xValues = cameraX + cameraWidth*(numpy.arange(intervals + 1)/intervals - 0.5)
+
+		# Every solution and every gradient of a solution is a row of samples. sources are the (equation, gradient) each row
+		# came from, and partners are the row of the solution of each gradient, which gives the y value of a turning point.
+		sources, rowSources, rowBranches, partners, samples = ([], [], [], [], [])
+
+		# Every equation is solved at the same x values, so subexpressions shared between them are only calculated once
+		solved, gradients = ( equations.plan.evaluate(analysed, xValues), equations.plan.evaluate(analysed, xValues, gradient=True) )
+
+		for equation in analysed:
+			for gradient, values in ( (False, solved[equation]), (True, gradients[equation]) ):
+				rowSources += [len(sources)] * len(values)
+				rowBranches += range(len(values))
+				partners += [ len(samples) - (len(values) if gradient else 0) + branch for branch in range(len(values)) ]
+				samples += list(values)
+				sources.append( (equation, gradient) )
+
+			if interrupted():
+				return None
+
+		rowSources, rowBranches, partners = ( numpy.array(rowSources, dtype=int), numpy.array(rowBranches, dtype=int), numpy.array(partners, dtype=int) )
+		samples = numpy.array(samples).reshape( (len(rowSources), len(xValues)) )
+		gradientRows = numpy.array( [ sources[source][1] for source in rowSources ], dtype=bool )
+		solutionRows, gradientRows = ( numpy.flatnonzero(~gradientRows), numpy.flatnonzero(gradientRows) )
+
+		# Each sign change is bracketed by two samples, and is a difference between the first row and the second row (or -1 for none)
+		brackets = []
+
+		rows, indexes = self.signChanges(samples[solutionRows])
+		brackets.append( (solutionRows[rows], numpy.full(len(rows), -1), indexes, 0) )
+
+		rows, indexes = self.signChanges(samples[gradientRows])
+		brackets.append( (gradientRows[rows], numpy.full(len(rows), -1), indexes, 1) )
+
+		# Only solutions of different equations are compared, one solution at a time against every solution after it
+		for position, row in enumerate(solutionRows[:-1]):
+			others = solutionRows[position+1:]
+			others = others[ rowSources[others] != rowSources[row] ]
+
+			rows, indexes = self.signChanges( samples[others] - samples[row] )
+			brackets.append( (numpy.full(len(rows), row), others[rows], indexes, 2) )
+
+			if interrupted():
+				return None
+
+		firstRows, secondRows, indexes = [ numpy.concatenate( [bracket[part] for bracket in brackets] ) for part in range(3) ]
+		kinds = numpy.concatenate( [ numpy.full(len(bracket[0]), bracket[3]) for bracket in brackets ] )
+
+		def evaluate(selected, xValues):
+			# The value of the function of each selected bracket at its own x value
+			values = self.evaluateRows(sources, rowSources, rowBranches, firstRows[selected], xValues)
+			second = secondRows[selected] >= 0
+			values[second] -= self.evaluateRows(sources, rowSources, rowBranches, secondRows[selected][second], xValues[second])
+			return values
+
+		def bracketValues(indexes):
+			second = numpy.where(secondRows >= 0, samples[secondRows, indexes], 0)
+			return samples[firstRows, indexes] - second
+
+		found = self.refine(evaluate, xValues[indexes], xValues[indexes + 1], bracketValues(indexes), bracketValues(indexes + 1), cameraWidth/options["gridWidth"]*self.precision, interrupted)
+		if found is None:
+			return None
+
+		pointX, valid = found
+
+		# The y value of a turning point is on the solution the gradient came from, and a root is always on the x axis
+		yRows = numpy.where(kinds == 1, partners[firstRows], firstRows)
+		pointY = numpy.where( kinds == 0, 0.0, self.evaluateRows(sources, rowSources, rowBranches, yRows, pointX) )
+
+		# Only the points that can be seen are kept, as the camera's y is upside down
+		with numpy.errstate(invalid="ignore"):
+			valid &= (pointY >= -cameraY - cameraHeight/2) & (pointY <= -cameraY + cameraHeight/2)
+
+		# Every equation added two sources, its solutions and their gradients
+		owners = numpy.column_stack( ( rowSources[firstRows[valid]] // 2, numpy.where( secondRows[valid] >= 0, rowSources[secondRows[valid]] // 2, -1 ) ) )
+
+		return (pointX[valid], pointY[valid], kinds[valid], analysed, owners)
+
+	def signChanges(self, values):
+		# Return the rows and the indexes of every pair of neighbouring samples in a row that a function crosses zero between.
+		# Either the samples have opposite signs, or one of them is exactly zero while the samples next to it aren't. A sample
+		# that lands on a point is found once, but a run of zeros (such as floor(x) between 0 and 1) isn't a point at all.
+		left, right = (values[:, :-1], values[:, 1:])
+		with numpy.errstate(invalid="ignore"):
+			changes = numpy.isfinite(left) & numpy.isfinite(right) & ( ((left > 0) & (right < 0)) | ((left < 0) & (right > 0)) )
+
+		zeros = values == 0
+		neighbours = numpy.pad(zeros, ((0, 0), (1, 1)))
+		rows, indexes = numpy.nonzero(changes)
+		zeroRows, zeroIndexes = numpy.nonzero( zeros & ~neighbours[:, :-2] & ~neighbours[:, 2:] )
+
+		# Each zero is paired with the sample after it, or with the one before it at the end of a row
+		zeroIndexes = numpy.minimum(zeroIndexes, values.shape[1] - 2)
+
+		return ( numpy.concatenate((rows, zeroRows)), numpy.concatenate((indexes, zeroIndexes)) )
+
+	def evaluateRows(self, sources, rowSources, rowBranches, rows, xValues):
+		# Evaluate each of an array of rows at its own x value, solving each equation (or its gradient) once for all of its rows
+		values = numpy.full(len(rows), numpy.nan)
+		selectedSources = rowSources[rows]
+
+		for source in numpy.unique(selectedSources):
+			inSource = selectedSources == source
+			equation, gradient = sources[source]
+
+			solutions = equation.solveDerivative(xValues[inSource]) if gradient else equation.solveArray(xValues[inSource])
+			values[inSource] = solutions[ rowBranches[rows[inSource]], numpy.arange(len(solutions[0])) ]
+
+		return values
+
+	def refine(self, evaluate, low, high, lowValues, highValues, tolerance, interrupted):
+		# Narrow every bracket [low, high] that a function changes sign across down to a point, all at once. evaluate(brackets, x)
+		# returns the value of the function of each of the brackets at an x value. The Illinois variant of false position is used,
+		# which halves the value kept at one end of a bracket if the same end is kept twice in a row, and bisection is used
+		# wherever a step would leave its bracket. Returns the points and which of them are where the function crosses zero,
+		# rather than where it jumps (such as at an asymptote), or None if interrupted.
+		startSize = numpy.minimum( numpy.abs(lowValues), numpy.abs(highValues) )
+
+		# A sample can land exactly on a point, which is then already found
+		points = numpy.where( lowValues == 0, low, numpy.where(highValues == 0, high, (low + high)/2) )
+		pointValues = numpy.where( (lowValues == 0) | (highValues == 0), 0.0, numpy.nan )
+
+		kept = numpy.zeros(len(low), dtype=numpy.int8) # End of each bracket kept by the last step, 1 for low and 2 for high
+		active = numpy.flatnonzero( numpy.isnan(pointValues) )
+
+		for iteration in range(self.maxIterations):
+			if len(active) == 0:
+				break
+
+			if interrupted():
+				return None
+
+			left, right, leftValues, rightValues = ( low[active], high[active], lowValues[active], highValues[active] )
+
+			with numpy.errstate(all="ignore"):
+				step = right - rightValues*(right - left)/(rightValues - leftValues)
+			step = numpy.where( (step > left) & (step < right), step, (left + right)/2 )
+			stepValues = evaluate(active, step)
+
+			# The step replaces the end with the same sign
+			replaceLow = (stepValues > 0) == (leftValues > 0)
+			keep = numpy.where(replaceLow, 2, 1)
+			halve = kept[active] == keep
+
+			low[active], lowValues[active] = ( numpy.where(replaceLow, step, left), numpy.where(replaceLow, stepValues, numpy.where(halve, leftValues/2, leftValues)) )
+			high[active], highValues[active] = ( numpy.where(replaceLow, right, step), numpy.where(replaceLow, numpy.where(halve, rightValues/2, rightValues), stepValues) )
+			kept[active] = keep
+			points[active], pointValues[active] = (step, stepValues)
+
+			# Brackets where the function is undefined at the step can't be narrowed any further
+			finished = (stepValues == 0) | ~numpy.isfinite(stepValues) | (high[active] - low[active] <= tolerance)
+			active = active[~finished]
+
+		with numpy.errstate(invalid="ignore"):
+			valid = numpy.abs(pointValues) <= startSize
+
+		return points, valid
 
 class equation():
 	def __init__(self, function):
 		# Split the equation into the left-hand side and the right-hand side
+		loadSympy()
 		self.visible = True
 
 				# Initalize the sympy symbols
@@ -774,68 +2202,1272 @@ class equation():
 
 		self.equationString = str(function).rstrip()
 
-		sides = function.replace(" ", "").lower().split("=")
-		self.leftSide = sides[0]
-		self.rightSide = sides[1]
+		# Equations that aren't a string with an equals sign, or whose sides aren't both expressions (such as y = x>1, y = True
+		# or y = sin), raise all sorts of errors here, which are raised as a ValueError so that they are reported as invalid
+		try:
+			sides = function.replace(" ", "").lower().strip().split("=")
+			self.leftSide = sides[0]
+			self.rightSide = sides[1]
+
+					# Create a sympy expression which is zero wherever the equation holds.
+			self.relation = sympy.sympify(self.leftSide) - sympy.sympify(self.rightSide)
+		except (AttributeError, IndexError, TypeError) as error:
+			raise ValueError("The equation should be two expressions separated by an equals sign") from error
+
+		if not isinstance(self.relation, sympy.Expr):
+			raise ValueError("The equation should be two expressions separated by an equals sign")
+
+		if not self.relation.free_symbols <= {self.x, self.y} or self.relation.atoms(sympy.core.function.AppliedUndef):
+			raise NameError("Only x and y can be used as variables, with functions that sympy recognises")
+
+		# The equation isn't drawn until it has been solved for y in the background
+		self.pending = True
+		self.implicit = False
+		self.failed = False # Whether working out the points of the equation raised an error, after which it isn't drawn
+		self.fx = []
+
+		# Most samples added per 32 pixels when refining, which is set every frame by the equation controller from the
+		# average times each sample has taken to solve and to draw, and the time the equation was added
+		self.noOfPlots = options["noOfPlotsBase"]
+		self.sampleSeconds = None
+		self.drawSeconds = None
+		self.addedTime = time.perf_counter()
+
+		# The newest points of the equation's curve worked out by the geometry worker, as (camera, points, complete, tiles),
+		# and the layer key they were last requested for
+		self.geometry = None
+		self.requested = None
+
+		# The equation is drawn onto its own layer, which is kept until the camera moves or new points are worked out
+		self.layer = None
+		self.layerKey = None
+		self.layerGeometry = None
+		self.layerRect = None # Part of the layer that has been drawn on, or None if nothing has
+		self.layerArea = None # Part of the layer that the points it was drawn from were worked out for
+		self.layerError = (0, 0) # Pixels that the layer is out of place by from being scrolled by whole pixels
+		self.layerEncoded = False # Whether the layer has been run-length encoded since it was last drawn
+
+	def setSolutions(self, solutions):
+		# Compile the solutions for y found by solveRelation. If there are none, the relation is drawn implicitly instead.
+		# Solutions that can't be compiled or evaluated over arrays (such as the LambertW of y = x**y) are also drawn implicitly.
+		# Raises a ValueError if the equation can't be drawn either way, such as y = 1/0.
+		self.solutions = solutions
+		self.fx = [sympy.sympify(solution) for solution in solutions]
+
+		try:
+			self.compileFunctions()
+		except ValueError:
+			if self.fx == []:
+				raise
+
+			self.fx = []
+			self.compileFunctions()
+
+		# The derivatives of the solutions are only compiled once they are first needed, as most equations are never analysed.
+		# This is False if they can't be compiled.
+		self.derivative = None
 
-				# Create a sympy equation and solve it for y.
-		self.fx = sympy.Eq( sympy.sympify(self.leftSide), sympy.sympify(self.rightSide) )
-		self.fx = sympy.solve(self.fx, self.y)
+		self.samples = implicitCache(self) if self.implicit else sampleCache(self)
+		self.pending = False
 
-		for i in range(len(self.fx)):
-			self.fx[i] = str(self.fx[i]).replace("-x**2", "-(x**2)")
+	def compileFunctions(self):
+		# Compile the solutions, or the relation if there are none. Raises a ValueError if they can't be compiled or evaluated.
+		# Relations without solutions are drawn by finding where leftSide - rightSide changes sign across the grid
+		self.implicit = self.fx == []
 
-	def solve(self, xValue):
-		#Solve the equation for some x value.
-		solutions = []
+		# sympy can't print some expressions as numpy code (such as complex infinity), and raises all sorts of errors when it can't
+		try:
+			if self.implicit:
+				self.implicitFunction = sympy.lambdify( (self.x, self.y), self.relation, "numpy" )
 
-		for equation in self.fx:
-			x = xValue
+					# Compile every solution once into a single numpy function, so that all of them can be evaluated over a whole array of x values at once.
+			# Subexpressions shared by the solutions (such as the square root in both halves of a circle) are only calculated once.
+			self.function = sympy.lambdify(self.x, self.fx, "numpy", cse=True)
+		except Exception as error:
+			raise ValueError("The equation can't be compiled") from error
 
+		# Solutions with complex parts that can cancel out are evaluated over complex numbers, and only the points where they
+		# are real are kept
+		self.complexValued = any( self.cancelsComplex(solution) for solution in self.fx )
+
+		self.checkFunctions()
+
+	def checkFunctions(self):
+		# Evaluate the compiled functions for a few x values. Some of sympy's functions (such as gamma and factorial) are
+		# compiled to functions that only take a single number, and some constants are too large to be a float, so these
+		# equations are rejected with a ValueError here instead of when they are drawn.
+		trialValues = numpy.linspace(-2.5, 2.5, 5)
+
+		try:
+			if self.implicit:
+				values = self.evaluateImplicit(trialValues, trialValues)
+				shape = trialValues.shape
+			else:
+				values = self.solveArray(trialValues)
+				shape = (len(self.fx), len(trialValues))
+		except Exception as error:
+			raise ValueError("The equation can't be evaluated over an array of values") from error
+
+		if values.shape != shape:
+			raise ValueError("The equation doesn't give a value for each x value")
+
+	def solveArray(self, xValues):
+		# Solve every solution of the equation for an array of x values, returning a (solutions, x values) array.
+		# Any point where a solution is undefined (such as dividing by zero or a complex result) is NaN.
+		if len(self.fx) == 0:
+			return numpy.empty( (0, len(xValues)) )
+
+		stats.begin("solve")
+		with numpy.errstate(all="ignore"):
+			# Constant solutions return a single value, which is spread across every x value.
+			yValues = numpy.array( numpy.broadcast_arrays( xValues, *self.function(self.inputValues(xValues)) )[1:] )
+
+		yValues = self.realValues(yValues)
+		stats.end("solve")
+		stats.count("samples", yValues.size)
+
+		return yValues
+
+	def solveDerivative(self, xValues):
+		# Find the gradient of every solution of the equation for an array of x values, returning a (solutions, x values) array
+		if len(self.fx) == 0:
+			return numpy.empty( (0, len(xValues)) )
+
+		# x is only real when it is differentiated, as sympy can't differentiate functions such as abs(x) for a complex x.
+		# Some derivatives still can't be compiled or evaluated (such as floor(x) or the DiracDelta from sign(x)), and the
+		# turning points of these equations aren't found, with every gradient NaN.
+		if self.derivative is None:
+			real = sympy.Symbol("x", real=True)
 			try:
-				solutions.append( eval( str(equation) ) )
-			except ValueError:
-				pass
+				self.derivative = sympy.lambdify(real, [sympy.diff(solution.subs(self.x, real), real) for solution in self.fx], "numpy", cse=True)
+			except Exception:
+				self.derivative = False
+
+		if self.derivative is False:
+			return numpy.full( (len(self.fx), len(xValues)), numpy.nan )
+
+		stats.begin("solve")
+		try:
+			with numpy.errstate(all="ignore"):
+				gradients = numpy.array( numpy.broadcast_arrays( xValues, *self.derivative(self.inputValues(xValues)) )[1:] )
+		except Exception:
+			self.derivative = False
+			gradients = numpy.full( (len(self.fx), len(xValues)), numpy.nan )
+
+		gradients = self.realValues(gradients)
+		stats.end("solve")
+		stats.count("samples", gradients.size)
+
+		return gradients
+
+	def bounds(self, xLow, xHigh):
+		# Return arrays of the lowest and highest y values that any solution could have between each pair of x values.
+		# The bounds are found with interval arithmetic, so they are never too narrow but can be much too wide.
+		lowest = numpy.full( numpy.shape(xLow), numpy.inf )
+		highest = numpy.full( numpy.shape(xLow), -numpy.inf )
+
+		for solution in self.fx:
+			if self.cancelsComplex(solution):
+				# Complex parts of a solution can cancel out, which interval arithmetic on real numbers can't show
+				return numpy.full( numpy.shape(xLow), -numpy.inf ), numpy.full( numpy.shape(xLow), numpy.inf )
+
+			low, high = intervalBounds(solution, self.x, xLow, xHigh)
+			lowest, highest = numpy.minimum(lowest, low), numpy.maximum(highest, high)
+
+		return lowest, highest
+
+	def evaluateImplicit(self, xValues, yValues):
+		# Evaluate leftSide - rightSide for arrays of x and y values, with NaN wherever it is undefined
+		stats.begin("solve")
+		with numpy.errstate(all="ignore"):
+			values = numpy.broadcast_arrays( xValues, self.implicitFunction(xValues, yValues) )[1]
+
+		values = self.realValues(values)
+		stats.end("solve")
+		stats.count("samples", values.size)
+
+		return values
+
+	def cancelsComplex(self, solution):
+		# Return whether a solution can be real where parts of it are complex. sympy often writes real solutions this way, such
+		# as the roots of a cubic, either with I or with powers of negative numbers that aren't whole, which numpy gives NaN for
+		# over real numbers. A single power of a negative number (such as a square root) is never real, so it is left undefined.
+		powers = [ power for power in solution.atoms(sympy.Pow) if not power.exp.is_Integer and not power.base.is_positive ]
+		return solution.has(sympy.I) or len(powers) > 1
+
+	def inputValues(self, xValues):
+		# Return the x values that the compiled solutions are evaluated for, which are complex if the solutions are
+		return numpy.asarray(xValues, dtype=complex) if self.complexValued else xValues
+
+	def realValues(self, values):
+		# Convert the results of a compiled function to real numbers, replacing any complex or infinite values with NaN
+		with numpy.errstate(all="ignore"):
+			if values.dtype == object:
+				values = values.astype(complex)
+
+			if numpy.iscomplexobj(values):
+				# Only keep the points where the imaginary part is negligible compared to the real part
+				values = numpy.where( numpy.abs(values.imag) < 1e-9*numpy.maximum(1, numpy.abs(values.real)), values.real, numpy.nan )
+
+		values = values.astype(float)
+		values[~numpy.isfinite(values)] = numpy.nan
+
+		return values
+
+class evaluationPlan():
+	# Compiles the solutions of every plotted equation into a single numpy function, in which subexpressions shared between
+	# equations (such as sin(x) in y = sin(x) and y = 2*sin(x) + x) are only calculated once. This is only used where every
+	# equation is solved at the same x values: the coarse samples of a tile, which line up between equations as the tiles
+	# do, and the samples (and gradients) that the analysis looks for points between. Equations evaluated over complex
+	# numbers are left out, so that the others aren't slowed down by them.
+	maxCoarseTiles = 1024 # Most tiles that coarse samples are kept for before they are all removed
+
+	def __init__(self):
+		self.equations = () # The equations the functions are compiled for
+		self.functions = {} # Whether the function finds gradients : compiled function, or None if it can't be compiled
+		self.coarse = {} # (level, index) : { equation : y values } of the coarse samples not yet used by each equation
+
+	def forget(self, equation):
+		# Stop sharing an equation's subexpressions, such as when it is deleted, so that the functions don't keep it in memory
+		if equation in self.equations:
+			self.equations, self.functions, self.coarse = ((), {}, {})
+
+	def compile(self, shared, gradient):
+		# Compile the solutions of some equations, or their gradients, into one function. Returns None if they can't be.
+		# As in solveDerivative, x is only real when it is differentiated.
+		try:
+			if gradient:
+				real = sympy.Symbol("x", real=True)
+				return sympy.lambdify( real, [ sympy.diff(solution.subs(equation.x, real), real) for equation in shared for solution in equation.fx ], "numpy", cse=True )
+
+			return sympy.lambdify( sympy.symbols("x"), [solution for equation in shared for solution in equation.fx], "numpy", cse=True )
+		except Exception:
+			return None
+
+	def evaluate(self, plotted, xValues, gradient=False):
+		# Solve some equations (or find their gradients) for an array of x values, returning a dict of equation : (solutions,
+		# x values) array. Each subexpression shared by equations in the plan is calculated once, and the rest are solved by themselves.
+		# Hidden equations are included as well, so that toggling an equation doesn't compile the functions again
+		shared = tuple( equation for equation in equations.equationList if not equation.pending and not equation.failed and not equation.implicit and not equation.complexValued )
+
+		# The functions are only compiled again once the plotted equations have changed, and each is only compiled the first
+		# time it is used. The geometry worker and the main loop can both be evaluating equations, so the plan's attributes
+		# are only read once and replaced together.
+		compiled, functions = (self.equations, self.functions)
+		if shared != compiled:
+			compiled, functions = (shared, {})
+			self.equations, self.functions, self.coarse = (compiled, functions, {})
+
+		if gradient not in functions and len(compiled) > 1:
+			functions[gradient] = self.compile(compiled, gradient)
+
+		function = functions.get(gradient)
+		results = {}
+
+		if function is not None and any( equation in compiled for equation in plotted ):
+			stats.begin("solve")
+			try:
+				with numpy.errstate(all="ignore"):
+					# Constant solutions return a single value, which is spread across every x value.
+					values = numpy.broadcast_arrays( xValues, *function(xValues) )[1:]
+			except Exception:
+				# The equations are solved by themselves instead, and any equation that can't be is found by itself
+				functions[gradient] = None
+			else:
+				solutionNum = 0
+				for equation in compiled:
+					results[equation] = equation.realValues( numpy.array(values[solutionNum : solutionNum + len(equation.fx)]) )
+					solutionNum += len(equation.fx)
+				stats.count("samples", solutionNum * len(xValues))
+				stats.count("sharedEvaluations")
+			stats.end("solve")
+
+		for equation in plotted:
+			if equation not in results:
+				results[equation] = equation.solveDerivative(xValues) if gradient else equation.solveArray(xValues)
+
+		return results
+
+	def coarseSamples(self, equation, level, index, xValues):
+		# Return the coarse samples of an equation's tile. The first equation to sample a tile solves every equation of the plan
+		# at its coarse x values, and the other equations' samples are kept until they sample the tile themselves.
+		key = (level, index)
+		coarse = self.coarse
+
+		if key not in coarse or equation not in coarse[key]:
+			if len(coarse) > self.maxCoarseTiles:
+				coarse.clear()
+			coarse[key] = self.evaluate( (equation,), xValues )
+
+		return coarse[key].pop(equation)
+
+class sampleCache():
+	# Stores the solved points of an equation in tiles, so that they can be reused between frames.
+	# Tiles are sampled for a pixel size which is always a power of two (the level), which lines the tiles up between
+	# frames no matter where the camera is, and lets a tile be reused for every zoom within a factor of two.
+	# When there isn't time to sample a tile of the right level, a tile of a level above it is shown for a few frames instead.
+	tileSize = 256 # Width of each tile in pixels of its level
+	coarseSpacing = 128 # Spacing in pixels between the first samples of a tile (its ends and middle), before they are refined
+	budgetSpacing = 32 # Width in pixels of the x values that an equation's noOfPlots samples can be added across
+	coarsestLevels = 1 # Most levels above the right level that are shown instead of it, so that their coarse samples still include the edges of each tile
+	roughSpacing = 8 # Spacing in pixels between the samples of a tile that is shown before it has been sampled, when no level above is cached
+	boundsIntervals = 8 # Number of intervals each tile is split into when checking if the curve can be seen
+	maxBounds = 4096 # Most tiles that the bounds are kept for before they are all removed
+	minSpacing = 0.25 # Smallest spacing in pixels that the samples will be refined to
+
+	# The tiles of every equation share one memory limit, so the least recently used tiles are found across all of them
+	usage = OrderedDict() # (sample cache, (level, index)) : bytes, ordered from least to most recently used
+	totalBytes = 0
+
+	def __init__(self, equation):
+		self.equation = equation
+		self.tiles = {} # (level, index) : (x values, y values, (lowest y, highest y) that the samples are accurate between)
+		self.limits = {} # (level, index) : noOfPlots of the equation when the tile was sampled, for tiles that ran out of samples
+		self.bounds = {} # (level, index) : (lowest y, highest y) arrays of the curve across each interval of a tile
+
+		self.lastView = None # Arguments of the last call to getSamples (without the deadline), which tiles are prefetched around
+		self.missing = False # Whether the last call to getSamples used any less accurate tiles
+		self.lastTiles = None # (level, { index : tile }) of the last call to getSamples, or None if it used any less accurate tiles
+
+	def getSamples(self, xMin, xMax, pixelDX, pixelDY, yMin, yMax, deadline=math.inf):
+		# Return the x values and y values from xMin to xMax that are accurate to about a pixel between yMin and yMax.
+		# Parts of the curve that are certainly outside of those y values are left undefined. Tiles that aren't cached are
+		# sampled from the middle of the screen outwards, and once the deadline (from time.perf_counter) has passed, the rest
+		# are shown less accurately until they are sampled in a later frame.
+		level = math.floor(math.log2(pixelDX))
+		tileWidth = self.tileSize * 2.0**level
+
+		# The largest error allowed in the y direction is half a pixel of the level
+		yTolerance = 0.5 * 2.0**level * pixelDY / pixelDX
+
+		self.lastView = (xMin, xMax, pixelDX, pixelDY, yMin, yMax)
+		self.missing = False
+
+		indexes = range( math.floor(xMin / tileWidth), math.floor(xMax / tileWidth)+1 )
+		tiles = { index: self.getTile(level, index, yTolerance, yMin, yMax, False) for index in indexes }
+
+		middle = (xMin + xMax) / 2 / tileWidth - 0.5
+		for index in sorted( (index for index in indexes if tiles[index] is None), key=lambda index: abs(index - middle) ):
+			if time.perf_counter() < deadline:
+				tiles[index] = self.newTile(level, index, yTolerance, yMin, yMax)
+			else:
+				tiles[index] = self.getCoarserTile(level, index, yMin, yMax)
+				self.missing = True
+
+		self.lastTiles = None if self.missing else (level, tiles)
+		tiles = [ tiles[index] for index in indexes ]
+
+		# Neighbouring tiles share their edge sample, so the last sample of each tile is dropped except for the final tile.
+		xValues = numpy.concatenate( [xTile[:-1] for xTile, yTile, band in tiles[:-1]] + [tiles[-1][0]] )
+		yValues = numpy.concatenate( [yTile[:, :-1] for xTile, yTile, band in tiles[:-1]] + [tiles[-1][1]], axis=1 )
+
+		return xValues, yValues
+
+	def canBeSeen(self, xMin, xMax, pixelDX, yMin, yMax):
+		# Return whether the curve could be between yMin and yMax anywhere from xMin to xMax. The bounds of the curve are found
+		# across the tiles of the level, so that they can be kept and reused while the camera moves.
+		level = math.floor(math.log2(pixelDX))
+		tileWidth = self.tileSize * 2.0**level
+
+		if len(self.bounds) > self.maxBounds:
+			self.bounds = {}
+
+		for index in range( math.floor(xMin / tileWidth), math.floor(xMax / tileWidth)+1 ):
+			if (level, index) not in self.bounds:
+				xEdges = numpy.linspace(index*tileWidth, (index+1)*tileWidth, self.boundsIntervals + 1)
+				self.bounds[ (level, index) ] = self.equation.bounds(xEdges[:-1], xEdges[1:])
+
+			lowest, highest = self.bounds[ (level, index) ]
+			if numpy.any( (highest >= yMin) & (lowest <= yMax) ):
+				return True
+
+		return False
+
+	def covers(self, key, yMin, yMax):
+		# Return whether a tile has been cached with samples that are accurate from yMin to yMax. A tile that ran out of samples
+		# isn't counted once the equation can add more than twice as many, so that it is sampled again more finely.
+		return key in self.tiles and self.tiles[key][2][0] <= yMin and self.tiles[key][2][1] >= yMax and 2*self.limits.get(key, math.inf) >= self.equation.noOfPlots
+
+	def getTile(self, level, index, yTolerance, yMin, yMax, sample=True):
+		# Return the samples of a tile, solving the equation only if the tile has not been cached for these y values.
+		# If sample is False, None is returned instead of solving the equation.
+		key = (level, index)
+
+		if self.covers(key, yMin, yMax):
+			sampleCache.usage.move_to_end( (self, key) )
+			stats.count("tileCacheHits")
+			return self.tiles[key]
+
+		stats.count("tileCacheMisses")
+
+		finerTiles = ( (level-1, 2*index), (level-1, 2*index+1) )
+
+		if self.covers(finerTiles[0], yMin, yMax) and self.covers(finerTiles[1], yMin, yMax):
+			# The two tiles of the level below cover the same x values more accurately, so they are joined and
+			# the samples that aren't needed at this level are removed.
+			left, right = self.tiles[finerTiles[0]], self.tiles[finerTiles[1]]
+			xValues = numpy.concatenate( (left[0][:-1], right[0]) )
+			yValues = numpy.concatenate( (left[1][:, :-1], right[1]), axis=1 )
+			band = ( max(left[2][0], right[2][0]), min(left[2][1], right[2][1]) )
+			samples = self.thinSamples(xValues, yValues, yTolerance) + (band,)
+			limit = min( self.limits.get(finerTiles[0], math.inf), self.limits.get(finerTiles[1], math.inf) )
+
+			self.store(key, samples, None if limit == math.inf else limit)
+			return samples
+
+		if not sample:
+			return None
+
+		return self.newTile(level, index, yTolerance, yMin, yMax)
+
+	def newTile(self, level, index, yTolerance, yMin, yMax):
+		# Sample and cache a tile. The tile is sampled for a band of y values three times the height of the screen, so that it
+		# can be reused while the camera moves up and down.
+		height = yMax - yMin
+		return self.sampleTile(level, index, yTolerance, (yMin - height, yMax + height))
+
+	def getCoarserTile(self, level, index, yMin, yMax):
+		# Return less accurate samples of a tile, to be shown until it is sampled. The samples of the nearest cached level
+		# above that are inside the tile are used, which include the edges of the tile as its coarse spacing lines up with them.
+		# If no level above is cached, the tile is solved at evenly spaced x values, which are neither refined nor cached.
+		tileWidth = self.tileSize * 2.0**level
+		stats.count("coarserTiles")
+
+		for coarseLevel in range(level+1, level + self.coarsestLevels + 1):
+			coarseKey = (coarseLevel, index // 2**(coarseLevel - level))
+
+			if self.covers(coarseKey, yMin, yMax):
+				sampleCache.usage.move_to_end( (self, coarseKey) )
+				xValues, yValues, band = self.tiles[coarseKey]
+				inside = (xValues >= index*tileWidth) & (xValues <= (index+1)*tileWidth)
+
+				return xValues[inside], yValues[:, inside], band
+
+		xValues = (index*self.tileSize + numpy.arange(0, self.tileSize+1, self.roughSpacing)) * 2.0**level
+
+		return xValues, self.equation.solveArray(xValues), (yMin, yMax)
+
+	def store(self, key, samples, limit=None):
+		# Cache the samples of a tile, removing the least recently used tiles of any equation once the memory limit is reached.
+		# limit is the noOfPlots the tile ran out of samples at, or None if it didn't run out.
+		if (self, key) in sampleCache.usage:
+			sampleCache.totalBytes -= sampleCache.usage.pop( (self, key) )
+
+		self.tiles[key] = samples
+		if limit is None:
+			self.limits.pop(key, None)
+		else:
+			self.limits[key] = limit
+		sampleCache.usage[ (self, key) ] = samples[0].nbytes + samples[1].nbytes
+		sampleCache.totalBytes += samples[0].nbytes + samples[1].nbytes
+
+		while sampleCache.totalBytes > options["sampleCacheMemory"] and len(sampleCache.usage) > 1:
+			(cache, oldKey), size = sampleCache.usage.popitem(last=False)
+			del cache.tiles[oldKey]
+			cache.limits.pop(oldKey, None)
+			sampleCache.totalBytes -= size
+
+	def clear(self):
+		# Remove every tile of this equation, such as when it is deleted
+		for key in self.tiles:
+			sampleCache.totalBytes -= sampleCache.usage.pop( (self, key) )
+
+		self.tiles = {}
+		self.limits = {}
+		self.bounds = {}
+
+	def prefetch(self):
+		# Sample one tile of the levels above and below the last view that isn't cached, returning whether a tile was sampled.
+		# The level below is sampled across the view, and the level above across twice its width.
+		# Tiles are only prefetched while the cache is less than half full, so that they never remove tiles that are being shown
+		if self.lastView is None or sampleCache.totalBytes > options["sampleCacheMemory"] / 2:
+			return False
+
+		xMin, xMax, pixelDX, pixelDY, yMin, yMax = self.lastView
+		level = math.floor(math.log2(pixelDX))
+		middle, width = ( (xMin + xMax)/2, xMax - xMin )
+
+		for prefetchLevel, prefetchWidth in ( (level-1, width), (level+1, 2*width) ):
+			tileWidth = self.tileSize * 2.0**prefetchLevel
+			yTolerance = 0.5 * 2.0**prefetchLevel * pixelDY / pixelDX
+
+			for index in range( math.floor( (middle - prefetchWidth/2) / tileWidth ), math.floor( (middle + prefetchWidth/2) / tileWidth )+1 ):
+				if not self.covers( (prefetchLevel, index), yMin, yMax ):
+					stats.count("prefetchedTiles")
+					self.getTile(prefetchLevel, index, yTolerance, yMin, yMax)
+					return True
+
+		return False
+
+	def sampleTile(self, level, index, yTolerance, band):
+		# Sample a tile coarsely, then repeatedly halve the intervals where the curve isn't straight to within the tolerance.
+		# Intervals where the curve is certainly outside of the band of y values are never solved or halved.
+		startTime = time.perf_counter()
+		pixelWidth = 2.0**level
+
+		xValues = (index*self.tileSize + numpy.arange(0, self.tileSize+1, self.coarseSpacing)) * pixelWidth
+
+		# Only the ends of the coarse intervals that could be inside the band are solved, and the rest are left undefined
+		inside = self.insideBand(xValues[:-1], xValues[1:], band)
+		needed = numpy.concatenate( (inside, [False]) ) | numpy.concatenate( ([False], inside) )
+
+		# The coarse x values of a tile are the same for every equation, so they are solved together with the other equations
+		if numpy.any(needed):
+			yValues = equations.plan.coarseSamples(self.equation, level, index, xValues)
+			yValues[:, ~needed] = numpy.nan
+		else:
+			yValues = numpy.full( (len(self.equation.fx), len(xValues)), numpy.nan )
+
+		# The middle sample checks whether the curve is straight across the whole tile, in which case (such as for y = x) the
+		# three coarse samples are all that are needed. Otherwise both halves that could be inside the band are checked.
+		if numpy.all(inside) and not self.splitNeeded(yValues[:, :1], yValues[:, 1:2], yValues[:, 2:], yTolerance)[0]:
+			inside = numpy.zeros(len(inside), dtype=bool)
+
+		leftX, rightX = xValues[:-1][inside], xValues[1:][inside]
+		leftY, rightY = yValues[:, :-1][:, inside], yValues[:, 1:][:, inside]
+
+		newX, newY = [xValues], [yValues]
+		# Most samples that can be added to a tile, so that no curve can take forever to refine
+		budget = self.equation.noOfPlots * len(leftX) * self.coarseSpacing // self.budgetSpacing
+
+		while len(leftX) > 0 and budget > 0:
+			leftX, rightX = leftX[:budget], rightX[:budget]
+			leftY, rightY = leftY[:, :budget], rightY[:, :budget]
+
+			middleX = (leftX + rightX) / 2
+			middleY = self.equation.solveArray(middleX)
+			budget -= len(middleX)
+
+			newX.append(middleX)
+			newY.append(middleY)
+
+			split = self.splitNeeded(leftY, middleY, rightY, yTolerance) & (rightX - leftX > 2*self.minSpacing*pixelWidth)
+
+			# Both halves of every split interval are checked next, unless the curve can't reach the band in that half
+			leftX, rightX = numpy.concatenate( (leftX[split], middleX[split]) ), numpy.concatenate( (middleX[split], rightX[split]) )
+			leftY, rightY = numpy.concatenate( (leftY[:, split], middleY[:, split]), axis=1 ), numpy.concatenate( (middleY[:, split], rightY[:, split]), axis=1 )
+
+			inside = self.insideBand(leftX, rightX, band)
+			leftX, rightX = leftX[inside], rightX[inside]
+			leftY, rightY = leftY[:, inside], rightY[:, inside]
+
+		xValues = numpy.concatenate(newX)
+		order = numpy.argsort(xValues)
+		samples = ( xValues[order], numpy.concatenate(newY, axis=1)[:, order], band )
+
+		# A tile that ran out of samples before the curve was straight is sampled again once the equation can add many more
+		self.store( (level, index), samples, self.equation.noOfPlots if len(leftX) > 0 else None )
+
+		# How long each sample took is measured, to divide the frame time budget between the equations
+		secondsPerSample = (time.perf_counter() - startTime) / len(samples[0])
+		if self.equation.sampleSeconds is None:
+			self.equation.sampleSeconds = secondsPerSample
+		else:
+			self.equation.sampleSeconds += (secondsPerSample - self.equation.sampleSeconds) / 4
+
+		return samples
+
+	def splitNeeded(self, leftY, middleY, rightY, yTolerance):
+		# Return which intervals need to be halved, from the samples at their ends and middles. An interval is split if the middle
+		# sample is too far from the straight line between its ends, or if the curve is only defined at some of the three
+		# samples (such as the edge of a square root).
+		with numpy.errstate(invalid="ignore"):
+			error = numpy.abs( middleY - (leftY + rightY)/2 )
+
+		leftDefined, middleDefined, rightDefined = numpy.isfinite(leftY), numpy.isfinite(middleY), numpy.isfinite(rightY)
+		split = (error > yTolerance) | (leftDefined != middleDefined) | (middleDefined != rightDefined)
+
+		return numpy.any(split, axis=0)
+
+	def insideBand(self, leftX, rightX, band):
+		# Return which intervals of x values the curve could be inside the band of y values in
+		if len(leftX) == 0:
+			return numpy.zeros(0, dtype=bool)
+
+		lowest, highest = self.equation.bounds(leftX, rightX)
+		return (highest >= band[0]) & (lowest <= band[1])
+
+	def thinSamples(self, xValues, yValues, yTolerance):
+		# Remove every other sample where it lies on the straight line between its neighbours to within the tolerance
+		middle = numpy.arange(1, len(xValues)-1, 2)
+
+		with numpy.errstate(invalid="ignore"):
+			fraction = (xValues[middle] - xValues[middle-1]) / (xValues[middle+1] - xValues[middle-1])
+			expected = yValues[:, middle-1] + fraction * (yValues[:, middle+1] - yValues[:, middle-1])
+			needed = numpy.abs(yValues[:, middle] - expected) > yTolerance
+
+		# Samples next to undefined points are always kept
+		needed |= ~numpy.isfinite(yValues[:, middle-1]) | ~numpy.isfinite(yValues[:, middle]) | ~numpy.isfinite(yValues[:, middle+1])
+
+		keep = numpy.ones(len(xValues), dtype=bool)
+		keep[middle] = numpy.any(needed, axis=0)
+
+		return xValues[keep], yValues[:, keep]
+
+class implicitCache(sampleCache):
+	# Stores the points of a relation that couldn't be solved for y in square tiles, so that they can be reused between frames.
+	# Like the tiles of explicit equations, they are found for pixel sizes that are powers of two (a level in each direction),
+	# which lines them up no matter where the camera is. Each tile is split into coarse cells, and only the cells that the
+	# curve passes through are split into finer cells and found with marching squares. The tiles share the memory limit of
+	# the sample caches.
+	tileSize = 128 # Width and height of each tile in pixels of its levels
+	cellSize = 8 # Size in pixels of the coarse cells of a tile
+	divisions = 2 # Number of times each side of a coarse cell is split where the curve passes through it
+	batchTiles = 8 # Most tiles that are found together before checking the deadline again
+	maxRoughTiles = 1024 # Most tiles that are kept with only their coarse cells found before they are all removed
+
+	def __init__(self, equation):
+		super().__init__(equation)
+		self.roughTiles = {} # (x level, y level, column, row) : (x values, y values) found with only the coarse cells
+
+	def getPoints(self, xMin, xMax, yMin, yMax, pixelDX, pixelDY, deadline=math.inf):
+		# Return the x values and y values of points along the curve from xMin to xMax and yMin to yMax, which are close enough
+		# together to be drawn as single pixels. Tiles that aren't cached are found from the middle of the screen outwards,
+		# and once the deadline (from time.perf_counter) has passed, the rest are only found with coarse cells until they
+		# are found in a later frame.
+		levels = ( math.floor(math.log2(pixelDX)), math.floor(math.log2(pixelDY)) )
+		tileWidth, tileHeight = ( self.tileSize * 2.0**levels[0], self.tileSize * 2.0**levels[1] )
+		self.missing = False
+
+		indexes = [ (column, row) for column in range( math.floor(xMin / tileWidth), math.floor(xMax / tileWidth)+1 ) for row in range( math.floor(yMin / tileHeight), math.floor(yMax / tileHeight)+1 ) ]
+		middle = ( (xMin + xMax) / 2 / tileWidth - 0.5, (yMin + yMax) / 2 / tileHeight - 0.5 )
+		tiles = {}
+		missing = []
+
+		for index in indexes:
+			if levels + index in self.tiles:
+				sampleCache.usage.move_to_end( (self, levels + index) )
+				stats.count("tileCacheHits")
+				tiles[index] = self.tiles[levels + index]
+			else:
+				missing.append(index)
+
+		# Finding several tiles together is much faster than finding them one at a time, so they are found in batches
+		missing.sort( key=lambda index: max( abs(index[0] - middle[0]), abs(index[1] - middle[1]) ) )
+
+		while missing != [] and time.perf_counter() < deadline:
+			batch, missing = ( missing[:self.batchTiles], missing[self.batchTiles:] )
+			stats.count("tileCacheMisses", len(batch))
+
+			for index, points in zip( batch, self.findPoints(levels, batch) ):
+				tiles[index] = points
+				self.store(levels + index, points)
+				self.roughTiles.pop(levels + index, None)
+
+		# The rest are only found with coarse cells, which are kept until the tiles are found in full, as finding every tile
+		# that is left again in each frame would take most of the frame's time
+		if missing != []:
+			stats.count("coarserTiles", len(missing))
+			rough = [ index for index in missing if levels + index not in self.roughTiles ]
+
+			if len(self.roughTiles) > self.maxRoughTiles:
+				self.roughTiles = {}
+
+			self.roughTiles.update( zip( [ levels + index for index in rough ], self.findPoints(levels, rough, False) ) )
+			tiles.update( (index, self.roughTiles[levels + index]) for index in missing )
+			self.missing = True
+
+		self.lastTiles = None if self.missing else (levels, tiles)
+
+		return ( numpy.concatenate( [ tiles[index][0] for index in indexes ] ), numpy.concatenate( [ tiles[index][1] for index in indexes ] ) )
+
+	def clear(self):
+		# Remove every tile of this equation, including the tiles that have only been found with coarse cells
+		super().clear()
+		self.roughTiles = {}
+
+	def findPoints(self, levels, indexes, refine=True):
+		# Return the points of the curve in each of a list of tiles of the levels, as (x values, y values). Every tile is
+		# evaluated together, in coordinates of pixels of its levels. If refine is False, the curve is only found across
+		# the coarse cells, which is less accurate but takes a fraction of the time.
+		pixelWidth, pixelHeight = ( 2.0**levels[0], 2.0**levels[1] )
+		corners = numpy.arange(0, self.tileSize + self.cellSize, self.cellSize)
+		tileX = numpy.array( [ index[0] for index in indexes ] ) * self.tileSize
+		tileY = numpy.array( [ index[1] for index in indexes ] ) * self.tileSize
+
+		cellX, cellY = numpy.broadcast_arrays( tileX[:, None, None] + corners[None, None, :], tileY[:, None, None] + corners[None, :, None] )
+		cellTiles = numpy.broadcast_to( numpy.arange(len(indexes))[:, None, None], cellX.shape )
+		size = self.cellSize
+		divisions = [self.divisions] if refine else []
+
+		# The corners of every cell, going around it from the top-left, are found for the coarse cells, and then again for
+		# the finer cells that every crossed coarse cell is split into
+		for division in [None] + divisions:
+			if division is not None:
+				offsets = numpy.arange(division + 1) * size / division
+				cellX, cellY = numpy.broadcast_arrays( cellX[:, None, None] + offsets[None, None, :], cellY[:, None, None] + offsets[None, :, None] )
+				cellTiles = numpy.broadcast_to( cellTiles[:, None, None], cellX.shape )
+				size /= division
+
+			values = self.equation.evaluateImplicit(cellX * pixelWidth, cellY * pixelHeight)
+			values = ( values[:, :-1, :-1], values[:, :-1, 1:], values[:, 1:, 1:], values[:, 1:, :-1] )
+			crossed = self.crossedCells(*values)
+			cellX, cellY, cellTiles = ( cellX[:, :-1, :-1][crossed], cellY[:, :-1, :-1][crossed], cellTiles[:, :-1, :-1][crossed] )
+			values = [ corner[crossed] for corner in values ]
+
+		starts, ends, saddleCells = self.marchingSquares(cellX, cellY, size, *values)
+
+		# A sign change can also be caused by an asymptote (such as in tan(x*y) = 1), where the value
+		# in the middle of the line is much further from zero than the values at the corners.
+		middle = self.equation.evaluateImplicit( (starts[:, 0] + ends[:, 0])/2 * pixelWidth, (starts[:, 1] + ends[:, 1])/2 * pixelHeight )
+		cornerSize = numpy.max( numpy.abs(values), axis=0 )
+		cornerSize = numpy.concatenate( (cornerSize, cornerSize[saddleCells]) )
+		cellTiles = numpy.concatenate( (cellTiles, cellTiles[saddleCells]) )
+
+		with numpy.errstate(invalid="ignore"):
+			valid = numpy.abs(middle) <= cornerSize
+
+		# The lines are never longer than a cell, so instead of drawing each one, the pixels at points about
+		# a pixel apart along them are coloured all at once.
+		starts, ends, cellTiles = ( starts[valid], ends[valid], cellTiles[valid] )
+		fractions = numpy.linspace(0, 1, math.ceil(size) + 1)
+		points = ( starts[None, :, :] + fractions[:, None, None] * (ends - starts)[None, :, :] ).reshape( (-1, 2) )
+		pointTiles = numpy.tile(cellTiles, len(fractions))
+
+		order = numpy.argsort(pointTiles, kind="stable")
+		points = points[order]
+		edges = numpy.searchsorted( pointTiles[order], numpy.arange(len(indexes) + 1) )
+
+		return [ ( points[start:end, 0] * pixelWidth, points[start:end, 1] * pixelHeight ) for start, end in zip(edges[:-1], edges[1:]) ]
+
+	def crossedCells(self, topLeft, topRight, bottomRight, bottomLeft):
+		# Return which cells have corners of different signs, so that the curve passes through them
+		with numpy.errstate(invalid="ignore"):
+			positive = (topLeft > 0) * 1 + (topRight > 0) * 1 + (bottomRight > 0) * 1 + (bottomLeft > 0) * 1
+
+		defined = numpy.isfinite(topLeft) & numpy.isfinite(topRight) & numpy.isfinite(bottomRight) & numpy.isfinite(bottomLeft)
+		return defined & (positive > 0) & (positive < 4)
+
+	# The edges of a cell that the curve crosses, for each combination of positive corners. Edges are numbered around the cell
+	# from the top (0 = top, 1 = right, 2 = bottom, 3 = left), and corners from the top-left, where the top has the lowest y.
+	marchingCases = {
+		1: (3, 0), 14: (3, 0),
+		2: (0, 1), 13: (0, 1),
+		4: (1, 2), 11: (1, 2),
+		8: (2, 3), 7: (2, 3),
+		3: (3, 1), 12: (3, 1),
+		6: (0, 2), 9: (0, 2)
+	}
+
+	def marchingSquares(self, cellX, cellY, size, topLeft, topRight, bottomRight, bottomLeft):
+		# Return the start and end points of the line through each cell, with one extra line at the end for every saddle cell,
+		# and which of the cells were saddle cells
+		values = numpy.stack( (topLeft, topRight, bottomRight, bottomLeft) )
+		case = (topLeft > 0) * 1 + (topRight > 0) * 2 + (bottomRight > 0) * 4 + (bottomLeft > 0) * 8
+
+		# The corners at each end of every edge, and where the curve crosses each edge using linear interpolation
+		cornerX = numpy.stack( (cellX, cellX + size, cellX + size, cellX) )
+		cornerY = numpy.stack( (cellY, cellY, cellY + size, cellY + size) )
+		edgeX, edgeY = [], []
+
+		for edge in range(4):
+			a, b = edge, (edge + 1) % 4
+			with numpy.errstate(invalid="ignore", divide="ignore"):
+				t = numpy.clip( values[a] / (values[a] - values[b]), 0, 1 )
+			edgeX.append( cornerX[a] + t * (cornerX[b] - cornerX[a]) )
+			edgeY.append( cornerY[a] + t * (cornerY[b] - cornerY[a]) )
+
+		edgeX, edgeY = numpy.stack(edgeX), numpy.stack(edgeY)
+
+		# Saddle cells have two opposite positive corners. Whether the middle of the cell is positive decides
+		# which pair of corners the two lines cut off.
+		saddleCells = (case == 5) | (case == 10)
+		middlePositive = numpy.sum(values, axis=0) > 0
+		cutTopLeft = (case == 5) != middlePositive
+
+		firstEdges = numpy.zeros( (2, len(case)), dtype=int )
+		for combination, edges in self.marchingCases.items():
+			firstEdges[:, case == combination] = numpy.array(edges)[:, None]
+
+		firstEdges[:, saddleCells & cutTopLeft] = numpy.array( (3, 0) )[:, None]
+		firstEdges[:, saddleCells & ~cutTopLeft] = numpy.array( (0, 1) )[:, None]
+		secondEdges = numpy.where( cutTopLeft[saddleCells], numpy.array( (1, 2) )[:, None], numpy.array( (2, 3) )[:, None] )
+
+		edges = numpy.concatenate( (firstEdges, secondEdges), axis=1 )
+		cells = numpy.concatenate( (numpy.arange(len(case)), numpy.flatnonzero(saddleCells)) )
+
+		starts = numpy.column_stack( (edgeX[edges[0], cells], edgeY[edges[0], cells]) )
+		ends = numpy.column_stack( (edgeX[edges[1], cells], edgeY[edges[1], cells]) )
+
+		return starts, ends, saddleCells
+
+class solutionCache():
+	# Stores the solutions of equations in an sqlite database, so that equations plotted before don't have to be solved again.
+	# sqlite locks the database file, so several copies of the program can share it safely.
+	def __init__(self, path):
+		self.path = path
+		self.connection = None
+
+	def connect(self):
+		# Open the database the first time it is needed, creating the table if it doesn't exist
+		if self.connection is None:
+			self.connection = sqlite3.connect(self.path, timeout=5)
+			self.connection.execute("PRAGMA journal_mode=WAL")
+			self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (equation TEXT, version TEXT, solutions TEXT, lastUsed REAL, PRIMARY KEY (equation, version))")
+
+		return self.connection
+
+	def getKey(self, equation):
+		# Solutions are stored for each equation and version of sympy, as a newer version may solve it differently
+		loadSympy()
+		return (equation.leftSide + "=" + equation.rightSide, sympy.__version__)
+
+	def get(self, equation):
+		# Return the stored solutions of an equation, or None if it hasn't been solved before
+		try:
+			with self.connect() as connection:
+				row = connection.execute("SELECT solutions FROM solutions WHERE equation = ? AND version = ?", self.getKey(equation)).fetchone()
+
+				if row is not None:
+					connection.execute("UPDATE solutions SET lastUsed = ? WHERE equation = ? AND version = ?", (time.time(), *self.getKey(equation)))
+		except sqlite3.Error:
+			# The equation is solved as normal if the database can't be used
+			return None
+
+		if row is not None:
+			return json.loads(row[0])
+
+	def put(self, equation, solutions):
+		# Store the solutions of an equation, removing the least recently used equations once the cache is full
+		try:
+			with self.connect() as connection:
+				connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)", (*self.getKey(equation), json.dumps(solutions), time.time()))
+				connection.execute("DELETE FROM solutions WHERE rowid IN (SELECT rowid FROM solutions ORDER BY lastUsed DESC LIMIT -1 OFFSET ?)", (options["solutionCacheSize"],))
+		except sqlite3.Error:
+			pass
+
+def intervalBounds(expression, x, low, high):
+	# Return arrays of the lowest and highest values that an expression of x can have, for x between each value of low and high.
+	# This is interval arithmetic on the expression's tree: the bounds of each part are found from the bounds of its arguments.
+	# Any part that isn't handled is unbounded, so the bounds can be too wide but never too narrow.
+	# Points where the expression is undefined (such as a negative square root) aren't drawn, so they aren't included.
+	low, high = numpy.asarray(low, dtype=float), numpy.asarray(high, dtype=float)
+	unbounded = ( numpy.full(low.shape, -numpy.inf), numpy.full(low.shape, numpy.inf) )
+
+	if expression == x:
+		return low, high
+
+	if expression.is_number:
+		try:
+			value = float(expression)
+		except TypeError:
+			# Complex constants
+			return unbounded
+
+		if not math.isfinite(value):
+			return unbounded
+
+		return numpy.full(low.shape, value), numpy.full(low.shape, value)
+
+	arguments = [ intervalBounds(argument, x, low, high) for argument in expression.args ]
+
+	with numpy.errstate(all="ignore"):
+		if isinstance(expression, sympy.Add):
+			newLow, newHigh = sum(bound[0] for bound in arguments), sum(bound[1] for bound in arguments)
+
+		elif isinstance(expression, sympy.Mul):
+			newLow, newHigh = arguments[0]
+			for argumentLow, argumentHigh in arguments[1:]:
+				products = numpy.stack( (newLow*argumentLow, newLow*argumentHigh, newHigh*argumentLow, newHigh*argumentHigh) )
+				# 0 * inf is NaN, which is made unbounded below
+				newLow, newHigh = numpy.min(products, axis=0), numpy.max(products, axis=0)
+
+		elif isinstance(expression, sympy.Pow):
+			(baseLow, baseHigh), exponent = arguments[0], expression.exp
+
+			if exponent.is_Integer:
+				n = int(exponent)
+				lowPower, highPower = baseLow**abs(n), baseHigh**abs(n)
+
+				if n % 2 == 0:
+					# Even powers are smallest at zero
+					newLow = numpy.where( (baseLow <= 0) & (baseHigh >= 0), 0, numpy.minimum(lowPower, highPower) )
+					newHigh = numpy.maximum(lowPower, highPower)
+				else:
+					newLow, newHigh = lowPower, highPower
+
+				if n < 0:
+					# The reciprocal is unbounded if the interval includes zero
+					containsZero = (newLow <= 0) & (newHigh >= 0)
+					newLow, newHigh = numpy.where(containsZero, -numpy.inf, 1/newHigh), numpy.where(containsZero, numpy.inf, 1/newLow)
+
+			elif exponent.is_number and exponent.is_real:
+				# Powers such as square roots are only defined for positive bases, where they are monotonic
+				e = float(exponent)
+				baseLow = numpy.maximum(baseLow, 0)
+				if e > 0:
+					newLow, newHigh = baseLow**e, baseHigh**e
+				else:
+					newLow, newHigh = baseHigh**e, numpy.where(baseLow > 0, baseLow**e, numpy.inf)
+
+				# The power is undefined everywhere if the base is always negative
+				undefined = baseHigh < 0
+				newLow, newHigh = numpy.where(undefined, -numpy.inf, newLow), numpy.where(undefined, numpy.inf, newHigh)
+
+			elif expression.base.is_number and expression.base.is_positive:
+				# Exponentials with a constant base are monotonic
+				base = float(expression.base)
+				exponentLow, exponentHigh = arguments[1]
+				newLow, newHigh = numpy.minimum(base**exponentLow, base**exponentHigh), numpy.maximum(base**exponentLow, base**exponentHigh)
+
+			else:
+				return unbounded
+
+		elif isinstance(expression, (sympy.sin, sympy.cos)):
+			argumentLow, argumentHigh = arguments[0]
+			# cos(x) = sin(x + pi/2), so the peaks and troughs of both are found in the same way
+			offset = math.pi/2 if isinstance(expression, sympy.cos) else 0
+			function = numpy.cos if isinstance(expression, sympy.cos) else numpy.sin
+
+			ends = numpy.stack( (function(argumentLow), function(argumentHigh)) )
+			newLow, newHigh = numpy.min(ends, axis=0), numpy.max(ends, axis=0)
+
+			# If a peak (pi/2 + 2k*pi for sin) or a trough is inside the interval, it is the highest or lowest value
+			peak = numpy.floor( (argumentHigh + offset - math.pi/2) / (2*math.pi) ) >= numpy.ceil( (argumentLow + offset - math.pi/2) / (2*math.pi) )
+			trough = numpy.floor( (argumentHigh + offset + math.pi/2) / (2*math.pi) ) >= numpy.ceil( (argumentLow + offset + math.pi/2) / (2*math.pi) )
+			newLow, newHigh = numpy.where(trough, -1, newLow), numpy.where(peak, 1, newHigh)
+
+		elif isinstance(expression, sympy.tan):
+			argumentLow, argumentHigh = arguments[0]
+			# tan is increasing between its asymptotes at pi/2 + k*pi, and unbounded across one
+			sameBranch = numpy.floor( (argumentLow + math.pi/2) / math.pi ) == numpy.floor( (argumentHigh + math.pi/2) / math.pi )
+			newLow, newHigh = numpy.where(sameBranch, numpy.tan(argumentLow), -numpy.inf), numpy.where(sameBranch, numpy.tan(argumentHigh), numpy.inf)
+
+		elif isinstance(expression, (sympy.exp, sympy.atan, sympy.sinh, sympy.asinh, sympy.tanh)):
+			# Increasing functions
+			function = { sympy.exp: numpy.exp, sympy.atan: numpy.arctan, sympy.sinh: numpy.sinh, sympy.asinh: numpy.arcsinh, sympy.tanh: numpy.tanh }[type(expression)]
+			newLow, newHigh = function(arguments[0][0]), function(arguments[0][1])
+
+		elif isinstance(expression, sympy.log) and len(arguments) == 1:
+			# log is increasing, and undefined for values that aren't positive
+			argumentLow, argumentHigh = arguments[0]
+			newLow = numpy.where(argumentLow > 0, numpy.log(argumentLow), -numpy.inf)
+			newHigh = numpy.where(argumentHigh > 0, numpy.log(argumentHigh), numpy.inf)
+
+		elif isinstance(expression, sympy.Abs):
+			argumentLow, argumentHigh = arguments[0]
+			newLow = numpy.where( (argumentLow <= 0) & (argumentHigh >= 0), 0, numpy.minimum(numpy.abs(argumentLow), numpy.abs(argumentHigh)) )
+			newHigh = numpy.maximum(numpy.abs(argumentLow), numpy.abs(argumentHigh))
+
+		else:
+			return unbounded
+
+	# Any bound that couldn't be calculated (such as inf - inf) is made unbounded
+	newLow, newHigh = numpy.broadcast_arrays(newLow, newHigh)
+	return numpy.where( numpy.isnan(newLow), -numpy.inf, newLow ), numpy.where( numpy.isnan(newHigh), numpy.inf, newHigh )
+
+class graphCatalog():
+	# Keeps an index of the graphs saved in a folder, so that the folder can be listed and searched without reading every file.
+	# The index is stored in the folder, and a file is only read again if its size or the time it was modified have changed.
+	indexName = ".catalog.json"
+
+	def __init__(self, path):
+		self.path = path
+		self.entries = None # File name : { "equation", "description", "mtime", "size" }
 
-		if solutions != []:
-			return solutions
+	def update(self):
+		# Bring the index up to date with the files in the folder, saving it if anything has changed
+		if self.entries is None:
+			try:
+				with open(os.path.join(self.path, self.indexName)) as indexFile:
+					self.entries = json.load(indexFile)
+			except (OSError, ValueError):
+				self.entries = {}
+
+		entries = {}
+		changed = False
+
+		with os.scandir(self.path) as folder:
+			for file in folder:
+				# Hidden files, such as the index, aren't graphs
+				if file.name.startswith(".") or not file.name.endswith(".json") or not file.is_file():
+					continue
+
+				fileStat = file.stat()
+				entry = self.entries.get(file.name)
+
+				if entry is None or entry["mtime"] != fileStat.st_mtime or entry["size"] != fileStat.st_size:
+					entry = { "equation": None, "description": "", "mtime": fileStat.st_mtime, "size": fileStat.st_size }
+					changed = True
+
+					try:
+						with open(file.path) as graphFile:
+							graphData = json.load(graphFile)
+						entry["equation"], entry["description"] = (str(graphData["equation"]), str(graphData.get("description", "")))
+					except (OSError, ValueError, KeyError, TypeError, AttributeError):
+						# Files that aren't graphs are kept in the index so they aren't read again, but are never listed
+						pass
+
+				entries[file.name] = entry
+
+		changed = changed or len(entries) != len(self.entries)
+		self.entries = entries
+
+		if changed:
+			self.save()
+
+	def save(self):
+		# Write the index to a temporary file and then replace the old index, so that it is never left half written
+		indexPath = os.path.join(self.path, self.indexName)
+
+		try:
+			with open(indexPath + ".tmp", 'w') as indexFile:
+				json.dump(self.entries, indexFile)
+			os.replace(indexPath + ".tmp", indexPath)
+		except OSError:
+			# The folder may be read only, in which case the index is only kept in memory
+			pass
+
+	def search(self, text):
+		# Return the graphs whose equation, description or file name contain the text, sorted by file name
+		text = text.strip().lower()
+		results = []
+
+		for fileName in sorted(self.entries):
+			entry = self.entries[fileName]
+			if entry["equation"] is not None and (text in entry["equation"].lower() or text in entry["description"].lower() or text in fileName.lower()):
+				results.append(entry)
+
+		return results
+
+# Workspace files start with these bytes, followed by the length of the JSON header as an unsigned 64 bit integer
+workspaceMagic = b"GRAPHWS1"
+
+def saveWorkspace(path, includeSamples):
+	# Save the plotted equations, whether they are visible, their solutions and the camera to a single file, and optionally
+	# the cached samples of each equation. Everything is described by a JSON header, which is followed by the samples as
+	# raw doubles so that they can be mapped into memory when loaded. The file is written to a temporary file first and then
+	# replaces the old file, so that it is never left half written.
+	header = { "camera": [grid.cameraX, grid.cameraY, grid.cameraWidth, grid.cameraHeight], "equations": [] }
+	arrays = []
+	offset = 0
+
+	for plotted in equations.equationList:
+		entry = { "equation": plotted.equationString, "visible": plotted.visible, "solutions": None, "tiles": [] }
+
+		# Equations that are still being solved are solved again when the workspace is loaded
+		if not plotted.pending:
+			entry["solutions"] = plotted.solutions
+
+			# The tiles of implicit equations are found again when the workspace is loaded
+			if includeSamples and not plotted.implicit:
+				with equations.worker.lock:
+					tiles = list(plotted.samples.tiles.items())
+
+				for (level, index), (xValues, yValues, band) in tiles:
+					# Each tile is stored as a block with a row of x values followed by a row for each solution
+					block = numpy.ascontiguousarray( numpy.vstack( (xValues, yValues) ), dtype="<f8" )
+					entry["tiles"].append({ "level": level, "index": index, "band": band, "rows": block.shape[0], "columns": block.shape[1], "offset": offset })
+					arrays.append(block)
+					offset += block.nbytes
+
+		header["equations"].append(entry)
+
+	headerBytes = json.dumps(header).encode()
+	# The samples start at a multiple of 8 bytes, so that they can be mapped as doubles
+	headerBytes += b" " * ( -(len(workspaceMagic) + 8 + len(headerBytes)) % 8 )
+
+	with open(path + ".tmp", 'wb') as workspaceFile:
+		workspaceFile.write(workspaceMagic + struct.pack("<Q", len(headerBytes)) + headerBytes)
+		for block in arrays:
+			workspaceFile.write(block.tobytes())
+
+	os.replace(path + ".tmp", path)
+
+def loadWorkspace(path):
+	# Add the equations of a workspace file to the plotted equations and move the camera to where it was saved, returning the
+	# new equations. Their samples are mapped from the file rather than read, so only the parts that are drawn are loaded.
+	# If any part of the file is invalid, the error is raised and the plotted equations and camera are left as they were.
+	with open(path, 'rb') as workspaceFile:
+		if workspaceFile.read( len(workspaceMagic) ) != workspaceMagic:
+			raise ValueError("Not a workspace file")
+
+		# The header's length is checked against the file's size before it is read, so that a damaged length can't ask for
+		# more memory than the file could hold
+		headerLength = struct.unpack("<Q", workspaceFile.read(8))[0]
+		if headerLength > os.path.getsize(path) - len(workspaceMagic) - 8:
+			raise ValueError("The header is longer than the file")
+
+		header = json.loads( workspaceFile.read(headerLength) )
+
+	samples = None
+	samplesStart = len(workspaceMagic) + 8 + headerLength
+	if os.path.getsize(path) > samplesStart:
+		samples = numpy.memmap(path, dtype="<f8", mode="r", offset=samplesStart)
+
+	camera = [ float(value) for value in header["camera"] ]
+	if len(camera) != 4:
+		raise ValueError("The camera should be four numbers")
+
+	loaded = []
+
+	try:
+		for entry in header["equations"]:
+			newEquation = equations.createEquation(entry["equation"], solutions=entry["solutions"])
+			loaded.append(newEquation)
+			newEquation.visible = entry["visible"]
+
+			if entry["tiles"] != [] and samples is None:
+				raise ValueError("The workspace has no samples")
+
+			# Equations without solutions are solved again, so they have no samples to store tiles in
+			if entry["tiles"] != [] and entry["solutions"] is None:
+				raise ValueError("An equation without solutions has samples")
+
+			with equations.worker.lock:
+				for tile in entry["tiles"]:
+					start = tile["offset"] // 8
+					block = samples[start : start + tile["rows"]*tile["columns"]].reshape( (tile["rows"], tile["columns"]) )
+					newEquation.samples.store( (tile["level"], tile["index"]), (block[0], block[1:], tuple(tile["band"])) )
+
+	except Exception:
+		# The equations added before the error are removed again
+		for newEquation in loaded:
+			equations.removeEquation(newEquation)
+		raise
+
+	grid.setCamera(*camera)
+	scheduler.markDirty()
+
+	return loaded
+
+def loadSympy():
+	# Import sympy if it hasn't been imported yet. When the program starts, this is called in the background after the
+	# first frame is drawn, so sympy is usually ready by the time the first equation is entered. If it is still being
+	# imported, this waits until the import has finished.
+	global sympy
+
+	if sympy is None:
+		import sympy
+
+	return sympy
+
+def initSolver():
+	# Processes started after pygame inherit its handler for SIGTERM, so the default handler is
+	# restored to let the pool stop a process that is still solving.
+	signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+def solveRelation(leftSide, rightSide):
+	# Solve an equation for y, returning the solutions as strings. This is run in a separate process by the equation controller,
+	# as sympy can take a long time. An empty list means that the equation has to be drawn implicitly.
+	loadSympy()
+	x, y = sympy.symbols("x y")
+	relation = sympy.sympify(leftSide) - sympy.sympify(rightSide)
+
+	try:
+		solutions = sympy.solve(sympy.Eq(relation, 0), y)
+	except NotImplementedError:
+		return []
+
+	# sympy only gives the principal solutions when y is inside a trigonometric function, so these are drawn implicitly instead
+	if any( y in function.args[0].free_symbols for function in relation.atoms(sympy.functions.elementary.trigonometric.TrigonometricFunction) ):
+		return []
+
+	return [sympy.srepr(solution) for solution in solutions]
+
+def solveWithTimeout(leftSide, rightSide):
+	# Solve an equation for y in this process, giving up after the same timeout as the solver pool by raising TimeoutError.
+	# The timer is a SIGALRM signal, so it can only be used in the main thread on platforms that have it. Elsewhere the
+	# equation is solved without a time limit.
+	if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+		return solveRelation(leftSide, rightSide)
+
+	def timeUp(signalNumber, frame):
+		raise TimeoutError("Solving took longer than the solve timeout")
+
+	previousHandler = signal.signal(signal.SIGALRM, timeUp)
+	try:
+		signal.setitimer(signal.ITIMER_REAL, options["solveTimeout"])
+		try:
+			return solveRelation(leftSide, rightSide)
+		finally:
+			signal.setitimer(signal.ITIMER_REAL, 0)
+	finally:
+		signal.signal(signal.SIGALRM, previousHandler)
 
 def readOptions():
 	global options
 
 	with open('options.json') as optionsFile:
 		data = json.load(optionsFile)
-		options = data
+		# Any options missing from the file keep their default values
+		options.update(data)
 
 def initApplication():
-	global grid, gui, input, equations
+	global grid, gui, input, equations, scheduler, stats
 
 	readOptions()
+	stats = frameStats()
+	stats.phase("imports")
 
 	gui = guiController()
+	stats.phase("tkinter")
 
 	os.environ['SDL_WINDOWID'] = str(gui.gridFrame.winfo_id())
 	if platform.system() == "Windows":
 		os.environ['SDL_VIDEODRIVER'] = 'windib'
-	pygame.init()
+	# Only the parts of pygame that are used are started, as starting the others (such as sound) can be slow
+	pygame.display.init()
+	pygame.font.init()
+	stats.phase("pygame")
 
 	grid = gridController()
 	input = inputHandler()
 	equations = equationController()
+	scheduler = renderScheduler()
+	equations.worker.start()
+	stats.phase("controllers")
+
+	gui.root.update()
+	scheduler.drawFrame()
+	stats.phase("firstFrame")
+	stats.finishStartup()
+
+	# sympy is imported while the user is typing their first equation
+	threading.Thread(target=loadSympy, daemon=True).start()
+
 	mainLoop()
 
 def mainLoop():
 
 	while True:
-		grid.drawGrid()
-
+		# Time spent outside of drawing is added to the statistics of the next frame that is drawn
+		stats.begin("tkinter")
 		gui.root.update_idletasks()
 		gui.root.update()
+		stats.end("tkinter")
 
+		stats.begin("input")
 		input.handleInput()
+		stats.end("input")
+
+		stats.begin("solver")
+		equations.update()
+		stats.end("solver")
+
+		scheduler.drawFrame()
+		scheduler.wait()
 
 	pygame.quit()
 	sys.exit(0)
 
-initApplication()
+def initHeadless(width, height):
+	# Set up the grid and equations without tkinter or a window, so that graphs can be drawn straight to images.
+	# The grid fills the whole width of the image.
+	global grid, equations, scheduler, stats
+
+	readOptions()
+	options["windowWidth"], options["gridWidth"], options["windowHeight"] = (width, width, height)
+	stats = frameStats()
+
+	os.environ['SDL_VIDEODRIVER'] = 'dummy'
+	pygame.display.init()
+	pygame.font.init()
+
+	grid = gridController()
+	equations = equationController()
+	scheduler = renderScheduler()
+
+if __name__ == "__main__":
+	initApplication()
 
@@ -0,0 +1,89 @@
+
+# Draws every saved graph in a folder to a PNG image, without opening the program's window.
+# For example: python render.py ./Graphs/Examples --output ./Thumbnails --size 350 300
+
+import argparse
+import os
+import sys
+import json
+import math
+import time
+import multiprocessing
+import pygame
+import sympy
+import main
+
+def initWorker(width, height, camera):
+	# Each process sets up the grid once, which is then reused for every graph it draws. pygame's handler for SIGTERM is
+	# replaced with the default one, so that the pool can still stop the process if drawing fails.
+	main.initHeadless(width, height)
+	main.initSolver()
+	main.grid.setCamera(*camera)
+
+	# Images are only drawn once, so every curve is sampled fully instead of being refined over later frames
+	main.options["frameBudget"] = math.inf
+
+def renderGraph(paths):
+	# Draw a single saved graph to an image, returning the path of the graph and whether it was drawn
+	graphPath, imagePath = paths
+
+	try:
+		with open(graphPath) as graphFile:
+			graphData = json.load(graphFile)
+
+		# The last graph is removed so that its samples stop counting towards the memory budget shared by every equation
+		for plotted in list(main.equations.equationList):
+			main.equations.removeEquation(plotted)
+
+		main.equations.createEquation(graphData["equation"], background=False)
+
+	except (OSError, ValueError, KeyError, IndexError, TypeError, NameError, sympy.SympifyError, SyntaxError):
+		# A file that isn't a JSON object raises a TypeError when its equation is looked up
+		return (graphPath, False)
+
+	# An error drawing one graph is reported like any other graph that can't be drawn, instead of stopping every process
+	try:
+		main.grid.drawGrid()
+		pygame.image.save(main.grid.graphSurface, imagePath)
+	except Exception:
+		return (graphPath, False)
+
+	return (graphPath, True)
+
+def renderFolder(path, output, width, height, camera, processes):
+	# Draw every graph in the folder using a pool of processes, returning the number of graphs drawn
+	os.makedirs(output, exist_ok=True)
+
+	# Get a list of only the graph files in the folder.
+	fileNames = sorted(name for name in os.listdir(path) if name.endswith(".json") and not name.startswith(".") and os.path.isfile(os.path.join(path, name)))
+	jobs = [ (os.path.join(path, name), os.path.join(output, os.path.splitext(name)[0] + ".png")) for name in fileNames ]
+
+	drawn = 0
+
+	with multiprocessing.Pool(processes, initializer=initWorker, initargs=(width, height, camera)) as pool:
+		# Graphs are handed out a few at a time, so that the processes stay busy without waiting on each other
+		for graphPath, success in pool.imap_unordered(renderGraph, jobs, chunksize=max(1, len(jobs) // (4 * processes))):
+			if success:
+				drawn += 1
+			else:
+				print("Could not draw {}".format(graphPath), file=sys.stderr)
+
+		# The processes are left to finish once every graph has been drawn, rather than being terminated
+		pool.close()
+		pool.join()
+
+	return drawn
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Draw every saved graph in a folder to a PNG image.")
+	parser.add_argument("folder", help="folder containing the saved graphs")
+	parser.add_argument("--output", default="./Renders", help="folder to write the images to")
+	parser.add_argument("--size", type=int, nargs=2, default=(700, 600), metavar=("WIDTH", "HEIGHT"), help="size of each image in pixels")
+	parser.add_argument("--camera", type=float, nargs=4, default=(0, 0, 20, 20), metavar=("X", "Y", "WIDTH", "HEIGHT"), help="centre and size of the area of the grid to draw")
+	parser.add_argument("--processes", type=int, default=os.cpu_count(), help="number of processes to draw the graphs with")
+	arguments = parser.parse_args()
+
+	startTime = time.perf_counter()
+	drawn = renderFolder(arguments.folder, arguments.output, *arguments.size, arguments.camera, arguments.processes)
+
+	print("Drew {} graphs in {:.2f} seconds".format(drawn, time.perf_counter() - startTime))